@@ -33,13 +33,13 @@ function selectFunction(item) {
 
           //AJAX PETITION
           $.ajax({
-            type: "POST",
-            url: "/request",
-            data: {value_championship: value_c, value_year: value_y},
+            type: "GET",
+            url: "/catalog",
+            data: {league: value_c, year: value_y},
             success: function(data) {
               $('#target_model_4 option:not(:first)').remove();
               $('#target_model5 option:not(:first)').remove();
-              const myArray = data.split("/");
+              const myArray = data.items;
               for(let i = 0; i<myArray.length; i++) {
                 var option = document.createElement("option");
                 option.value = myArray[i];
@@ -56,12 +56,12 @@ function selectFunction(item) {
 
           //AJAX PETITION
         $.ajax({
-          type: "POST",
-          url: "/request",
-          data: {value_championship: value_c, value_year: value_y, value_squad: value_s},
+          type: "GET",
+          url: "/catalog",
+          data: {league: value_c, year: value_y, team: value_s},
           success: function(data) {
             $('#target_model_'+(5).toString()+' option:not(:first)').remove();
-            const myArray = data.split("/");
+            const myArray = data.items;
             for(let i = 0; i<myArray.length; i++) {
 
               var option = document.createElement("option");
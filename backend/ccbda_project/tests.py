@@ -1,3 +1,380 @@
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.core.cache import caches
+from django.db.models import F
+from djangoProject3 import forecast_cache, inference
+from djangoProject3.audit import AuditWriter
+from djangoProject3.forecast_cache import bump_dataset_version, dataset_version
+from djangoProject3.ingest import copy_statement
+from djangoProject3.models import (Dataset_Version, League, Player, Player_Forecast, Player_Status, Request, Team,
+                                   Team_Status, User)
+from djangoProject3.predictors import HORIZON, PlayerPredictor, get_predictor, model_version
+from djangoProject3.views import history_page, page_cursor, parse_cursor, stored_forecast
 
-# Create your tests here.
+import csv
+import io
+import os
+import tempfile
+import threading
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+PLAYER_COLUMNS = ['namePlayer', 'age', 'role', 'valuePlayer', 'nameTeam', 'year', 'games', 'goals', 'assists',
+                  'minutes', 'nameLeague', 'goalsConceded', 'cleanSheets']
+SQUAD_COLUMNS = ['nameTeam', 'avgAge', 'valueTeam', 'year', 'numberPlayers', 'nameLeague']
+
+
+def player(name, team, year, league, goals=0):
+    return [name, 25, 'Centre-Forward', 1000000, team, year, 10, goals, 0, 900, league, '', '']
+
+
+def squad(team, year, league):
+    return [team, 25.0, 100000000, year, 25, league]
+
+
+# Two leagues over two seasons
+PLAYERS = [
+    player('Ann Striker', 'Alpha FC', 2020, 'league-a'),
+    player('Ann Striker', 'Alpha FC', 2021, 'league-a'),
+    player('Bob Keeper', 'Beta FC', 2020, 'league-b'),
+    player('Bob Keeper', 'Beta FC', 2021, 'league-b'),
+]
+SQUADS = [
+    squad('Alpha FC', 2020, 'league-a'),
+    squad('Alpha FC', 2021, 'league-a'),
+    squad('Beta FC', 2020, 'league-b'),
+    squad('Beta FC', 2021, 'league-b'),
+]
+
+
+class IncrementalParseDataTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.parse('full', PLAYERS, SQUADS)
+
+    def write(self, name, columns, rows):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        return path
+
+    def parse(self, name, players, squads, *args):
+        call_command('parseData', *args,
+                     players=self.write(f'{name}-players.csv', PLAYER_COLUMNS, players),
+                     squads=self.write(f'{name}-squads.csv', SQUAD_COLUMNS, squads),
+                     stdout=io.StringIO())
+
+    def version(self):
+        return Dataset_Version.objects.get(pk=1).version
+
+    def test_partial_refresh_only_touches_its_partitions(self):
+        self.parse('weekly', [player('Ann Striker', 'Alpha FC', 2021, 'league-a', goals=7)],
+                   [squad('Alpha FC', 2021, 'league-a')], '--incremental')
+
+        self.assertEqual(Player_Status.objects.count(), 4)
+        self.assertEqual(Team_Status.objects.count(), 4)
+        self.assertEqual(Player_Status.objects.get(player__name='Ann Striker', year=2021).goals, 7)
+
+        # Refreshing another season from another file leaves the first one alone
+        self.parse('next', [player('Bob Keeper', 'Beta FC', 2022, 'league-b')],
+                   [squad('Beta FC', 2022, 'league-b')], '--incremental')
+
+        self.assertEqual(Player_Status.objects.count(), 5)
+        self.assertEqual(Player_Status.objects.get(player__name='Ann Striker', year=2021).goals, 7)
+
+    def test_unchanged_refresh_keeps_the_dataset_version(self):
+        version = self.version()
+
+        self.parse('same', PLAYERS, SQUADS, '--incremental')
+
+        self.assertEqual(self.version(), version)
+
+    def test_changed_refresh_bumps_the_dataset_version(self):
+        version = self.version()
+
+        self.parse('weekly', [player('Ann Striker', 'Alpha FC', 2021, 'league-a', goals=3)],
+                   [squad('Alpha FC', 2021, 'league-a')], '--incremental')
+
+        self.assertEqual(self.version(), version + 1)
+
+    def rows(self):
+        return list(Player_Status.objects.order_by('id').values()), list(Team_Status.objects.order_by('id').values())
+
+    def test_full_reload_of_the_same_data_changes_nothing(self):
+        rows = self.rows()
+
+        self.parse('again', PLAYERS, SQUADS)
+
+        self.assertEqual(self.rows(), rows)
+
+    def test_incremental_reload_of_the_same_data_changes_nothing(self):
+        rows = self.rows()
+
+        self.parse('again', PLAYERS, SQUADS, '--incremental')
+        self.parse('again', PLAYERS, SQUADS, '--incremental')
+
+        self.assertEqual(self.rows(), rows)
+
+    def test_full_snapshot_empties_the_partitions_it_lacks(self):
+        self.parse('snapshot', PLAYERS[:2], SQUADS[:2], '--incremental', '--full-snapshot')
+
+        self.assertEqual(set(Player_Status.objects.values_list('league__name', flat=True)), {'league-a'})
+        self.assertEqual(set(Team_Status.objects.values_list('league__name', flat=True)), {'league-a'})
+
+
+class AuditTests(TransactionTestCase):
+    def setUp(self):
+        League.objects.create(name='league-a')
+        Team.objects.create(name='Alpha FC')
+        Player.objects.create(name='Ann Striker')
+        self.user = User.objects.create(email='ann@example.com', password='unused')
+        self.writer = AuditWriter()
+        self.addCleanup(self.writer.close)
+
+    def row(self, user_id):
+        return ('goals', 'league-a', 2021, 'Alpha FC', 'Ann Striker', user_id)
+
+    def test_anonymous_forecast_request_is_sent_to_login(self):
+        response = self.client.post('/request', {'create_model': '1', 'target': 'goals', 'championship': 'league-a',
+                                                 'year': 2021, 'squad': 'Alpha FC', 'player': 'Ann Striker'})
+
+        self.assertRedirects(response, '/login', fetch_redirect_response=False)
+
+    def test_rows_without_a_user_are_dropped(self):
+        with self.assertLogs('djangoProject3.audit', 'WARNING'):
+            self.writer._write([self.row(self.user.id), self.row(None)])
+
+        self.assertEqual(Request.objects.count(), 1)
+
+    def test_a_bad_row_does_not_drop_the_batch(self):
+        with self.assertLogs('djangoProject3.audit', 'ERROR'):
+            self.writer._write([self.row(self.user.id), self.row(self.user.id + 1000), self.row(self.user.id)])
+
+        self.assertEqual(list(Request.objects.values_list('user_id', flat=True)), [self.user.id, self.user.id])
+        self.assertEqual(self.writer.written, 2)
+
+
+class StoredForecastTests(TestCase):
+    def setUp(self):
+        # Read the version of this test's database
+        forecast_cache._version = None
+        League.objects.create(name='league-a')
+        Team.objects.create(name='Alpha FC')
+        Player.objects.create(name='Ann Striker')
+        self.store(goals=5)
+
+    def store(self, goals):
+        Player_Forecast.objects.bulk_create(
+            Player_Forecast(player=Player.objects.get(name='Ann Striker'), modelVersion=model_version(),
+                            datasetVersion=dataset_version(), year=2022 + i, age=26 + i, valuePlayer=1000000,
+                            games=10, goals=goals, assists=2, minutes=900, role='Centre-Forward',
+                            team=Team.objects.get(name='Alpha FC'), league=League.objects.get(name='league-a'))
+            for i in range(HORIZON)
+        )
+
+    def test_forecast_of_the_current_data_is_served(self):
+        self.assertEqual(stored_forecast('Ann Striker')['year'], list(range(2022, 2022 + HORIZON)))
+
+    def test_forecast_of_reloaded_data_is_stale(self):
+        bump_dataset_version()
+
+        self.assertIsNone(stored_forecast('Ann Striker'))
+
+    def test_forecasts_of_two_data_versions_are_kept_apart(self):
+        bump_dataset_version()
+        self.store(goals=7)
+
+        self.assertEqual(stored_forecast('Ann Striker')['goals'], [7] * HORIZON)
+
+
+@override_settings(METRICS_TOKEN='secret', BCRYPT_ROUNDS=4)
+class MetricsTests(TestCase):
+    def test_password_hashing_time_is_exported(self):
+        self.client.post('/register', {'email': 'ann@example.com', 'password': 'pw', 'repeat_password': 'pw'})
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertContains(response, 'ccbda_password_seconds_count{operation="hash"} ')
+        self.assertContains(response, 'ccbda_password_rounds 4')
+
+    def test_model_load_cost_is_exported(self):
+        get_predictor()
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertContains(response, 'ccbda_predictor_loaded 1')
+        self.assertContains(response, 'ccbda_predictor_load_seconds ')
+        self.assertContains(response, 'ccbda_predictor_resident_bytes ')
+
+
+class LinearModel:
+    """
+    Stand-in for the model: every target is a fixed mix of its lags, the age
+    and the year, so a difference in the features changes the forecast
+    """
+
+    def predict(self, features):
+        columns = []
+        for i, col in enumerate(['games_played', 'goals', 'assists', 'minute_played', 'value_player']):
+            lags = [np.nan_to_num(features[f"lag_{level}_{col}"].to_numpy(dtype=float)) for level in (1, 2, 3)]
+            columns.append(0.6 * lags[0] + 0.3 * lags[1] + 0.1 * lags[2] + features['age'].to_numpy() * (i + 1)
+                           + features['year'].to_numpy() % 7)
+        return np.column_stack(columns)
+
+
+def loop_forecast(predictor, last):
+    """
+    The year by year forecast pred_player_lag made before rollout
+    """
+    final = pd.DataFrame()
+    pred = last.reset_index()
+    for _ in range(HORIZON):
+        crafted = predictor.step_row(pred)
+        result = pd.DataFrame(predictor.clf.predict(crafted), columns=predictor.target_cols)
+        pred = pd.concat([crafted, result], axis=1)
+        final = pd.concat([final, pred], axis=0)
+    return final[predictor.output_cols]
+
+
+class RolloutTests(TestCase):
+    def test_rollout_matches_the_year_by_year_loop(self):
+        predictor = PlayerPredictor(clf=LinearModel())
+        rows = [
+            {'namePlayer': 'Ann Striker', 'age': 20 + i, 'role': 'Centre-Forward', 'valuePlayer': 1000000 * (i + 1),
+             'nameTeam': 'Alpha FC', 'year': 2015 + i, 'games': 20 + i, 'goals': 3 * i, 'assists': i % 3,
+             'minutes': 1500 + 100 * i, 'nameLeague': 'league-a', 'goalsConceded': 0, 'cleanSheets': 0}
+            for i in range(6)
+        ]
+
+        expected = loop_forecast(predictor, predictor.lag_features(rows).iloc[-1:])
+        forecast = predictor.pred_player_lag(rows)
+
+        pd.testing.assert_frame_equal(forecast.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        League.objects.create(name='league-a')
+
+    def test_catalog_is_revalidated_with_its_etag(self):
+        response = self.client.get('/catalog')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get('/catalog', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_year_must_be_a_number(self):
+        self.assertEqual(self.client.get('/catalog', {'league': 'league-a', 'year': 'abc'}).status_code, 400)
+
+
+class ForecastViewTests(TestCase):
+    def setUp(self):
+        session = self.client.session
+        session['email'] = 'ann@example.com'
+        session.save()
+
+    def test_year_must_be_a_number(self):
+        response = self.client.get('/forecast', {'championship': 'league-a', 'year': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cascade_year_must_be_a_number(self):
+        response = self.client.post('/request', {'value_championship': 'league-a', 'value_year': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_player_history_is_answered_whatever_the_year(self):
+        response = self.client.get('/player_history', {'player': 'Ann Striker', 'year': 'abc'})
+
+        self.assertEqual(response.status_code, 200)
+
+
+class CopyStatementTests(SimpleTestCase):
+    def test_empty_text_is_not_read_as_null(self):
+        fields = [f for f in Player_Status._meta.concrete_fields if not f.primary_key]
+
+        statement = copy_statement('"staging"', fields)
+
+        self.assertIn('FORCE_NOT_NULL ("role")', statement)
+
+
+class RemoteForecastTests(SimpleTestCase):
+    @override_settings(INFERENCE_SERVER_URL='http://inference.invalid')
+    async def test_inference_server_is_called_off_the_inference_pool(self):
+        threads = []
+
+        def post_forecast(rows):
+            threads.append(threading.current_thread().name)
+            return {'goals': [1.0]}
+
+        with mock.patch.object(inference, 'post_forecast', post_forecast):
+            self.assertEqual(await inference.remote_forecast([{'namePlayer': 'Ann Striker'}]), {'goals': [1.0]})
+
+        self.assertTrue(threads[0].startswith('inference-server'))
+
+
+@override_settings(FORECAST_CACHE_ALIAS='default')
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        forecast_cache._local.clear()
+        # Read the version of this test's database
+        forecast_cache._version = None
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'goals': [self.computed]}
+
+    def test_both_tiers_serve_a_computed_forecast(self):
+        forecast_cache.cached('forecast', 'Ann Striker', self.compute)
+        forecast_cache._local.clear()
+
+        self.assertEqual(forecast_cache.cached('forecast', 'Ann Striker', self.compute), {'goals': [1]})
+        self.assertEqual(forecast_cache.cached('forecast', 'Ann Striker', self.compute), {'goals': [1]})
+        self.assertEqual(self.computed, 1)
+
+    def test_bumping_the_version_misses_both_tiers(self):
+        forecast_cache.cached('forecast', 'Ann Striker', self.compute)
+        shared_misses = forecast_cache.stats()['shared_misses']
+
+        bump_dataset_version()
+
+        self.assertEqual(forecast_cache.cached('forecast', 'Ann Striker', self.compute), {'goals': [2]})
+        self.assertEqual(forecast_cache.stats()['shared_misses'], shared_misses + 1)
+
+    @override_settings(FORECAST_CACHE_VERSION_TTL=0)
+    def test_version_bumped_by_another_process_misses_both_tiers(self):
+        forecast_cache.cached('forecast', 'Ann Striker', self.compute)
+
+        # What bump_dataset_version() does in the process running parseData
+        Dataset_Version.objects.filter(pk=1).update(version=F('version') + 1)
+
+        self.assertEqual(forecast_cache.cached('forecast', 'Ann Striker', self.compute), {'goals': [2]})
+
+
+class HistoryPageTests(TestCase):
+    def test_pages_walk_every_request_once_when_times_tie(self):
+        league = League.objects.create(name='league-a')
+        team = Team.objects.create(name='Alpha FC')
+        player = Player.objects.create(name='Ann Striker')
+        user = User.objects.create(email='ann@example.com', password='unused')
+        Request.objects.bulk_create(Request(target='goals', league=league, year=2021, team=team, player=player,
+                                            user=user) for _ in range(5))
+        # Rows backfilled by migration 0022 share one time
+        Request.objects.update(created_at=Request.objects.first().created_at)
+
+        seen, before = [], None
+        while True:
+            rows = history_page(user.id, before, size=2)
+            seen += [row[-1] for row in rows]
+            if len(rows) < 2:
+                break
+            before = parse_cursor(page_cursor(rows[-1]))
+
+        self.assertEqual(seen, sorted(Request.objects.values_list('id', flat=True), reverse=True))
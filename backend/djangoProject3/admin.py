@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Profiling_Session
+
+
+@admin.register(Profiling_Session)
+class Profiling_SessionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'sample_rate', 'slower_than', 'until', 'updated_at')
+
+    # The middleware only reads the row with pk 1
+    def has_add_permission(self, request):
+        return not Profiling_Session.objects.exists()
+
+    def save_model(self, request, obj, form, change):
+        obj.pk = 1
+        super().save_model(request, obj, form, change)
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoProject3.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+# With an inference server the web workers only load the model to fall back
+if settings.PRELOAD_PREDICTOR and not settings.INFERENCE_SERVER_URL:
+    from .predictors import preload_predictor
+
+    preload_predictor()
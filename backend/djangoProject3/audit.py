@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import connection
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from . import metrics
+from .models import League, Player, Team, Request
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Queues the Request rows of the forecasts served and writes them with
+    bulk_create on a thread of its own, once `flush_size` rows are waiting or
+    every `flush_interval` seconds, and at exit. record() never blocks: when
+    `max_queue` rows are already waiting the row is dropped and counted.
+    created_at is the time of the write, at most flush_interval seconds late.
+    """
+
+    def __init__(self, flush_size=100, flush_interval=1.0, max_queue=10000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._loop, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, target, league, year, team, player, user_id):
+        """
+        Queue a request, given by the names of its league, team and player
+        """
+        try:
+            self._queue.put_nowait((target, league, year, team, player, user_id))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=10):
+        """
+        Write what is still queued and stop the thread
+        """
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP and len(batch) < self.flush_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            rows = [row for row in batch if row is not _STOP]
+            if rows:
+                self._write(rows)
+            if stop:
+                return
+
+    def _write(self, rows):
+        try:
+            leagues = dict(League.objects.filter(name__in={row[1] for row in rows}).values_list('name', 'id'))
+            teams = dict(Team.objects.filter(name__in={row[3] for row in rows}).values_list('name', 'id'))
+            players = dict(Player.objects.filter(name__in={row[4] for row in rows}).values_list('name', 'id'))
+            requests = [
+                Request(target=target, league_id=leagues[league], year=year, team_id=teams[team],
+                        player_id=players[player], user_id=user_id)
+                for target, league, year, team, player, user_id in rows
+                if league in leagues and team in teams and player in players and user_id is not None
+            ]
+            if len(requests) < len(rows):
+                logger.warning("Dropped %d requests without a user or naming an unknown league, team or player",
+                               len(rows) - len(requests))
+            with metrics.span('request_save'):
+                try:
+                    Request.objects.bulk_create(requests)
+                    self.written += len(requests)
+                except Exception:
+                    # One bad row fails the whole insert, write them one by one
+                    logger.exception("Could not write %d requests at once, writing them one by one", len(requests))
+                    for request in requests:
+                        try:
+                            request.save()
+                            self.written += 1
+                        except Exception:
+                            logger.exception("Could not write the request of user %s", request.user_id)
+        except Exception:
+            logger.exception("Could not write %d requests", len(rows))
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """
+    The writer of this process, started on first use so that forked server
+    workers each get their own thread
+    """
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                _writer = AuditWriter(settings.AUDIT_FLUSH_SIZE, settings.AUDIT_FLUSH_INTERVAL,
+                                      settings.AUDIT_QUEUE_SIZE)
+                _writer_pid = os.getpid()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def record(target, league, year, team, player, user_id):
+    get_writer().record(target, league, year, team, player, user_id)
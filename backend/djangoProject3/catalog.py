@@ -0,0 +1,38 @@
+from django.conf import settings
+import hashlib
+import json
+
+from .forecast_cache import LRUCache, dataset_version
+from .models import League, Player_Status, Team_Status
+
+_cache = LRUCache(settings.CATALOG_CACHE_SIZE)
+
+
+def catalog_items(league=None, year=None, team=None):
+    """
+    Next level of the league -> year -> team -> player cascade, sorted
+    """
+    if not league:
+        return list(League.objects.order_by('name').values_list('name', flat=True))
+    if not year:
+        return list(Team_Status.objects.filter(league__name=league).order_by('year')
+                    .values_list('year', flat=True).distinct())
+    if not team:
+        return list(Team_Status.objects.filter(league__name=league, year=year).order_by('team__name')
+                    .values_list('team__name', flat=True))
+    return list(Player_Status.objects.filter(league__name=league, year=year, team__name=team)
+                .order_by('player__name').values_list('player__name', flat=True))
+
+
+def catalog_entry(league=None, year=None, team=None):
+    """
+    (items, JSON body, ETag) for a cascade level, built once per dataset version
+    """
+    key = (dataset_version(), league or None, year or None, team or None)
+    entry = _cache.get(key)
+    if entry is None:
+        items = catalog_items(league, year, team)
+        body = json.dumps({'items': items}).encode('utf-8')
+        entry = (items, body, hashlib.sha1(repr(key).encode('utf-8') + body).hexdigest())
+        _cache.set(key, entry)
+    return entry
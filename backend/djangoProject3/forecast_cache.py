@@ -0,0 +1,182 @@
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+import hashlib
+import threading
+import time
+
+from .models import Dataset_Version
+from .predictors import model_version
+
+
+class LRUCache:
+    """
+    Bounded in-process cache with hit/miss counters
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
+
+_local = LRUCache(settings.FORECAST_CACHE_SIZE)
+_shared_hits = 0
+_shared_misses = 0
+
+_version = None
+_version_updated_at = None
+_version_checked = 0.0
+
+
+def dataset_version():
+    """
+    Version of the Player_Status/Team_Status data, bumped by every parseData
+    run. Re-read from the database at most every FORECAST_CACHE_VERSION_TTL
+    seconds, so other processes see a reload within that delay.
+    """
+    global _version, _version_updated_at, _version_checked
+    now = time.monotonic()
+    if _version is None or now - _version_checked >= settings.FORECAST_CACHE_VERSION_TTL:
+        version, updated_at = Dataset_Version.objects.filter(pk=1).values_list(
+            'version', 'updated_at').first() or (0, None)
+        if version != _version:
+            # Entries of older versions can never be hit again
+            _local.clear()
+        _version, _version_updated_at, _version_checked = version, updated_at, now
+    return _version
+
+
+def dataset_updated_at():
+    """
+    When the dataset version was last bumped, None if never
+    """
+    dataset_version()
+    return _version_updated_at
+
+
+def bump_dataset_version():
+    """
+    Invalidate every cached result after the data has been reloaded
+    """
+    global _version
+    if not Dataset_Version.objects.filter(pk=1).update(version=F('version') + 1):
+        Dataset_Version.objects.create(pk=1, version=1)
+    _local.clear()
+    _version = None
+
+
+def _shared_cache():
+    alias = settings.FORECAST_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    # Player names contain spaces, which memcached keys may not
+    return "forecast:" + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def cache_key(kind, player):
+    # Reads the dataset version and, on first use, hashes model.joblib
+    return f"{kind}:{dataset_version()}:{model_version()}:{player}"
+
+
+def cached(kind, player, compute):
+    """
+    Return compute() for `player`, going through the in-process LRU and then
+    the optional shared Django cache. Results must be picklable.
+    """
+    global _shared_hits, _shared_misses
+
+    key = cache_key(kind, player)
+    value = _local.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    shared = _shared_cache()
+    if shared is not None:
+        value = shared.get(_shared_key(key), _MISSING)
+        if value is not _MISSING:
+            _shared_hits += 1
+            _local.set(key, value)
+            return value
+        _shared_misses += 1
+
+    value = compute()
+    _local.set(key, value)
+    if shared is not None:
+        shared.set(_shared_key(key), value, settings.FORECAST_CACHE_TIMEOUT)
+    return value
+
+
+async def acached(kind, player, compute):
+    """
+    cached() for async views, `compute` is a coroutine function
+    """
+    global _shared_hits, _shared_misses
+
+    key = await sync_to_async(cache_key)(kind, player)
+    value = _local.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    shared = _shared_cache()
+    if shared is not None:
+        value = await shared.aget(_shared_key(key), _MISSING)
+        if value is not _MISSING:
+            _shared_hits += 1
+            _local.set(key, value)
+            return value
+        _shared_misses += 1
+
+    value = await compute()
+    _local.set(key, value)
+    if shared is not None:
+        await shared.aset(_shared_key(key), value, settings.FORECAST_CACHE_TIMEOUT)
+    return value
+
+
+def stats():
+    """
+    Hit/miss counters of both tiers, to size FORECAST_CACHE_SIZE
+    """
+    return {
+        'local_hits': _local.hits,
+        'local_misses': _local.misses,
+        'local_entries': len(_local),
+        'local_maxsize': _local.maxsize,
+        'shared_hits': _shared_hits,
+        'shared_misses': _shared_misses,
+        'dataset_version': _version,
+    }
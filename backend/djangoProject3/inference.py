@@ -0,0 +1,145 @@
+from concurrent.futures import Future
+from django.conf import settings
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+import json
+import logging
+import threading
+import time
+
+import pandas as pd
+
+from . import metrics
+from .pools import BoundedPool, PoolBusy
+
+
+logger = logging.getLogger(__name__)
+
+
+# Feature building and predict of the async views. XGBoost and most of pandas
+# release the GIL, and the model is shared by every thread.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BoundedPool(settings.INFERENCE_POOL_SIZE, settings.INFERENCE_QUEUE_DEPTH, 'inference')
+    return _pool
+
+
+async def run(fn, *args):
+    """
+    Await fn(*args) computed on the inference pool, raises PoolBusy when
+    the pool has no room left
+    """
+    return await get_pool().run(fn, *args)
+
+
+class MicroBatcher:
+    """
+    Merges the forecasts asked within `window` seconds, up to `max_batch`
+    players, into one predictor.pred_batch call. submit() may be called from
+    any thread; the batches run one at a time on a thread of their own.
+    """
+
+    def __init__(self, predictor, window=0.01, max_batch=64):
+        self.predictor = predictor
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.forecasts = 0
+        self._pending = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, name='micro-batcher', daemon=True).start()
+
+    def submit(self, rows):
+        """
+        Future of the forecast of one player, from its Player_Status rows as
+        given by with_names(), in the shape of pred_player_lag(...).to_dict("list")
+        """
+        future = Future()
+        if not rows:
+            future.set_exception(ValueError("no rows to forecast from"))
+            return future
+        with self._cond:
+            self._pending.append((rows, future))
+            self._cond.notify()
+        return future
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_batch and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            # The same player may have been asked twice within the window
+            players = {rows[0]['namePlayer']: rows for rows, _ in batch}
+            prediction = self.predictor.pred_batch(pd.DataFrame([row for rows in players.values() for row in rows]))
+            forecasts = {name: group.drop(columns='name_player').to_dict("list")
+                         for name, group in prediction.groupby('name_player', sort=False)}
+            self.batches += 1
+            self.forecasts += len(batch)
+            for rows, future in batch:
+                future.set_result(forecasts[rows[0]['namePlayer']])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# The inference server is not tried again until then after it failed
+_server_down_until = 0.0
+
+# Calls to the inference server wait on the network, on threads of their own
+# so a slow server cannot take the slots of the local predictions
+_remote_pool = None
+
+
+def get_remote_pool():
+    global _remote_pool
+    if _remote_pool is None:
+        with _pool_lock:
+            if _remote_pool is None:
+                _remote_pool = BoundedPool(settings.INFERENCE_SERVER_POOL_SIZE, settings.INFERENCE_SERVER_QUEUE_DEPTH,
+                                           'inference-server')
+    return _remote_pool
+
+
+async def remote_forecast(rows):
+    """
+    Forecast of one player computed by the inference server at
+    INFERENCE_SERVER_URL (manage.py inferenceServer), None when none is
+    configured, it did not answer within INFERENCE_SERVER_TIMEOUT or too
+    many calls to it are already waiting.
+    """
+    if not settings.INFERENCE_SERVER_URL or time.monotonic() < _server_down_until:
+        return None
+    try:
+        return await get_remote_pool().run(post_forecast, rows)
+    except PoolBusy:
+        return None
+
+
+def post_forecast(rows):
+    global _server_down_until
+    request = Request(settings.INFERENCE_SERVER_URL.rstrip('/') + '/forecast',
+                      data=json.dumps({'rows': rows}, default=str).encode('utf-8'),
+                      headers={'Content-Type': 'application/json'})
+    try:
+        with metrics.span('inference_server'), urlopen(request, timeout=settings.INFERENCE_SERVER_TIMEOUT) as response:
+            return json.load(response)['forecast']
+    except (URLError, OSError, ValueError, KeyError) as e:
+        logger.warning("Inference server unavailable, predicting in process: %s", e)
+        _server_down_until = time.monotonic() + settings.INFERENCE_SERVER_RETRY
+        return None
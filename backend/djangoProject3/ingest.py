@@ -0,0 +1,323 @@
+from django.db import connection, transaction
+from itertools import islice
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+from .models import League, Player, Team, Player_Status, Team_Status, Ingest_Checksum
+
+
+# Columns of players.csv/squads.csv stored as they are, besides the names
+PLAYER_FIELDS = ['age', 'role', 'valuePlayer', 'year', 'games', 'goals', 'assists',
+                 'minutes', 'goalsConceded', 'cleanSheets']
+TEAM_FIELDS = ['avgAge', 'valueTeam', 'year', 'numberPlayers']
+
+# Natural keys the upserts conflict on
+PLAYER_KEY = ['player', 'team', 'year']
+TEAM_KEY = ['team', 'year']
+
+
+def batches(rows, batch_size):
+    """
+    Lists of at most batch_size rows, read lazily from `rows`
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def clean_player_row(row: dict) -> dict:
+    for san in ["goalsConceded", "goals", "assists", "cleanSheets"]:
+        if row[san] == "" or row[san] is None:
+            row[san] = 0
+    return row
+
+
+class Ingest:
+    """
+    Upserts players.csv/squads.csv shaped rows in batches. Every batch is one
+    transaction and rows are matched on their natural key, so loading the
+    same data twice leaves the tables unchanged.
+    """
+
+    def __init__(self, batch_size=5000, progress=print):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.ids = {Player: {}, Team: {}, League: {}}
+
+    def resolve(self, model, names):
+        known = self.ids[model]
+        missing = {name for name in names if name not in known}
+        if missing:
+            known.update(model.ids(missing))
+        return known
+
+    def player_status(self, row: dict) -> Player_Status:
+        return Player_Status(
+            player_id=self.ids[Player][row['namePlayer']],
+            team_id=self.ids[Team][row['nameTeam']],
+            league_id=self.ids[League][row['nameLeague']],
+            **{field: row[field] for field in PLAYER_FIELDS},
+        )
+
+    def team_status(self, row: dict) -> Team_Status:
+        return Team_Status(
+            team_id=self.ids[Team][row['nameTeam']],
+            league_id=self.ids[League][row['nameLeague']],
+            **{field: row[field] for field in TEAM_FIELDS},
+        )
+
+    def player_objects(self, rows):
+        rows = [clean_player_row(row) for row in rows]
+        self.resolve(Player, (row['namePlayer'] for row in rows))
+        self.resolve(Team, (row['nameTeam'] for row in rows))
+        self.resolve(League, (row['nameLeague'] for row in rows))
+        return [self.player_status(row) for row in rows]
+
+    def team_objects(self, rows):
+        self.resolve(Team, (row['nameTeam'] for row in rows))
+        self.resolve(League, (row['nameLeague'] for row in rows))
+        return [self.team_status(row) for row in rows]
+
+    def players(self, rows, label="Player_Status"):
+        def load(batch):
+            upsert(Player_Status, self.player_objects(batch), PLAYER_KEY, ['league'] + PLAYER_FIELDS)
+
+        return self.run(rows, load, label, 'players')
+
+    def teams(self, rows, label="Team_Status"):
+        def load(batch):
+            upsert(Team_Status, self.team_objects(batch), TEAM_KEY, ['league'] + TEAM_FIELDS)
+
+        return self.run(rows, load, label, 'squads')
+
+    def players_delta(self, path, read, format='csv', snapshot=False):
+        return Delta(self, 'players', Player_Status, PLAYER_KEY, ['league'] + PLAYER_FIELDS,
+                     self.player_objects).run(path, read, format, snapshot)
+
+    def teams_delta(self, path, read, format='csv', snapshot=False):
+        return Delta(self, 'squads', Team_Status, TEAM_KEY, ['league'] + TEAM_FIELDS,
+                     self.team_objects).run(path, read, format, snapshot)
+
+    def run(self, rows, load, label, source):
+        # The table no longer matches the checksums of the last incremental loads, from any file
+        Ingest_Checksum.objects.filter(source__startswith=f"{source}:").delete()
+
+        start = time.time()
+        total = 0
+        for batch in batches(rows, self.batch_size):
+            with transaction.atomic():
+                load(batch)
+            total += len(batch)
+            elapsed = time.time() - start
+            self.progress(f"{label}: {total} rows, {total / elapsed if elapsed else 0:.0f} rows/s")
+        return total
+
+
+def file_checksum(path):
+    """
+    Checksum of a file, or of every file under a directory such as a
+    partitioned Parquet export
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    for name in files:
+        digest.update(os.path.relpath(name, path).encode('utf-8'))
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def partition_of(row: dict) -> str:
+    return f"{row['nameLeague']}/{row['year']}"
+
+
+def partition_checksums(rows):
+    """
+    Checksum of every league/season partition of `rows`. Row digests are
+    summed, so the result does not depend on the order of the rows.
+    """
+    sums = {}
+    for row in rows:
+        digest = hashlib.blake2b(json.dumps(row, sort_keys=True).encode('utf-8'), digest_size=16).digest()
+        partition = partition_of(row)
+        sums[partition] = (sums.get(partition, 0) + int.from_bytes(digest, 'big')) % (1 << 128)
+    return {partition: f"{total:032x}" for partition, total in sums.items()}
+
+
+def source_key(kind, path, format):
+    """
+    Ingest_Checksum.source of a file (or Parquet directory) of `kind`
+    ('players' or 'squads'), so that the checksums of different inputs,
+    e.g. a full CSV and a one-season Parquet export, are never compared
+    """
+    return f"{kind}:{format}:{os.path.abspath(path)}"
+
+
+class Delta:
+    """
+    Incremental load of one source file: unchanged files and league/season
+    partitions are skipped, changed partitions are diffed against the table
+    and only the inserted, updated and deleted rows are written. Partitions
+    missing from the file are left alone, unless the file is a full snapshot.
+    """
+
+    def __init__(self, ingest, kind, model, key, fields, build):
+        self.ingest = ingest
+        self.kind = kind
+        self.model = model
+        self.key = [model._meta.get_field(f) for f in key]
+        self.fields = [model._meta.get_field(f) for f in fields]
+        self.build = build
+        self.inserted = self.updated = self.deleted = 0
+
+    def key_of(self, obj):
+        return tuple(f.to_python(getattr(obj, f.attname)) for f in self.key)
+
+    def values_of(self, obj):
+        return tuple(f.to_python(getattr(obj, f.attname)) for f in self.fields)
+
+    def run(self, path, read, format='csv', snapshot=False):
+        """
+        Apply the file at `path`; read(path) yields its rows as dicts. With
+        `snapshot` the file holds all the data, and the league/season
+        partitions of the table it lacks are emptied. Returns whether any
+        row was inserted, updated or deleted.
+        """
+        self.source = source_key(self.kind, path, format)
+        checksum = file_checksum(path)
+        stored = dict(Ingest_Checksum.objects.filter(source=self.source).values_list('partition', 'checksum'))
+        if stored.get('') == checksum and not snapshot:
+            return False
+
+        current = partition_checksums(read(path))
+        changed = {partition for partition, value in current.items() if stored.get(partition) != value}
+        removed = set()
+        if snapshot:
+            removed = {f"{league}/{year}" for league, year in
+                       self.model.objects.values_list('league__name', 'year').distinct()} - set(current)
+
+        rows = {partition: [] for partition in changed}
+        for row in read(path):
+            partition = partition_of(row)
+            if partition in rows:
+                rows[partition].append(row)
+
+        others = Ingest_Checksum.objects.filter(source__startswith=f"{self.kind}:").exclude(source=self.source)
+        for partition in sorted(changed | removed):
+            with transaction.atomic():
+                self.apply(partition, rows.get(partition, []))
+                # The other files no longer describe what the table holds for this partition
+                others.filter(partition__in=[partition, '']).delete()
+                if partition in removed:
+                    Ingest_Checksum.objects.filter(source=self.source, partition=partition).delete()
+                else:
+                    Ingest_Checksum.objects.update_or_create(
+                        source=self.source, partition=partition, defaults={'checksum': current[partition]})
+
+        Ingest_Checksum.objects.update_or_create(source=self.source, partition='', defaults={'checksum': checksum})
+        self.ingest.progress(f"{self.kind}: {len(changed)} changed and {len(removed)} removed partitions "
+                             f"out of {len(current)}, {self.inserted} inserted, {self.updated} updated, "
+                             f"{self.deleted} deleted")
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def apply(self, partition, rows):
+        league, year = partition.rsplit('/', 1)
+        league_id = League.ids([league])[league]
+
+        existing = {}
+        for row in self.model.objects.filter(league_id=league_id, year=year).values_list(
+                'id', *(f.attname for f in self.key), *(f.attname for f in self.fields)):
+            existing[tuple(row[1:1 + len(self.key)])] = (row[0], tuple(row[1 + len(self.key):]))
+
+        # Later rows win over earlier ones with the same key, as in upsert()
+        objs = {self.key_of(obj): obj for obj in self.build(rows)}
+
+        changes = []
+        for key, obj in objs.items():
+            if key not in existing:
+                self.inserted += 1
+                changes.append(obj)
+            elif existing[key][1] != self.values_of(obj):
+                self.updated += 1
+                changes.append(obj)
+
+        stale = [row_id for key, (row_id, _) in existing.items() if key not in objs]
+        if stale:
+            self.deleted += len(stale)
+            self.model.objects.filter(id__in=stale).delete()
+        if changes:
+            upsert(self.model, changes, [f.name for f in self.key], [f.name for f in self.fields])
+
+
+def upsert(model, objs, unique_fields, update_fields):
+    """
+    Insert `objs`, updating the rows that already exist with the same
+    unique_fields. Uses COPY into a temporary table on PostgreSQL.
+    """
+    # A statement may not touch the same row twice, keep the last duplicate
+    objs = list({tuple(getattr(obj, model._meta.get_field(f).attname) for f in unique_fields): obj
+                 for obj in objs}.values())
+
+    if connection.vendor == 'postgresql':
+        copy_upsert(model, objs, unique_fields, update_fields)
+    else:
+        model.objects.bulk_create(objs, update_conflicts=True, unique_fields=unique_fields,
+                                  update_fields=update_fields)
+
+
+def copy_statement(staging, fields):
+    """
+    COPY of CSV rows into `staging`. An empty field is read as NULL, except in
+    the text columns that cannot be NULL, where it is an empty string.
+    """
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(f.column) for f in fields)
+    not_null = ", ".join(qn(f.column) for f in fields
+                         if not f.null and f.get_internal_type() in ('CharField', 'TextField'))
+    force = f", FORCE_NOT_NULL ({not_null})" if not_null else ""
+    return f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv{force})"
+
+
+def copy_upsert(model, objs, unique_fields, update_fields):
+    qn = connection.ops.quote_name
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+    columns = ", ".join(qn(f.column) for f in fields)
+    table = qn(model._meta.db_table)
+    staging = qn(f"staging_{model._meta.db_table}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for obj in objs:
+        writer.writerow(["" if value is None else value
+                         for value in (f.get_db_prep_value(getattr(obj, f.attname), connection) for f in fields)])
+    buffer.seek(0)
+
+    conflict = ", ".join(qn(model._meta.get_field(f).column) for f in unique_fields)
+    updates = ", ".join(f"{qn(model._meta.get_field(f).column)} = EXCLUDED.{qn(model._meta.get_field(f).column)}"
+                        for f in update_fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMP TABLE {staging} AS SELECT {columns} FROM {table} WITH NO DATA")
+        copy_sql = copy_statement(staging, fields)
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            # psycopg2
+            raw.copy_expert(copy_sql, buffer)
+        else:
+            # psycopg 3
+            with raw.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                       f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}")
+        cursor.execute(f"DROP TABLE {staging}")
@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from djangoProject3.predictors import (PlayerPredictor, get_predictor, model_version, obj_to_df, fill_years, rename,
+                                       to_df)
+
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import statistics
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+def load_careers(path):
+    """
+    Rows of every player in players.csv as Player_Status.objects.with_names()
+    returns them, longest careers last
+    """
+    players = pd.read_csv(path)
+    # parseData stores the empty counts as 0
+    for column in ["goalsConceded", "goals", "assists", "cleanSheets"]:
+        players[column] = players[column].fillna(0).astype(int)
+    careers = {name: group.to_dict('records') for name, group in players.groupby('namePlayer', sort=True)}
+    return sorted(careers.values(), key=len)
+
+
+def pick_careers(careers):
+    """
+    Short (10th percentile), median and longest career, by number of seasons
+    """
+    lengths = [len(career) for career in careers]
+    picks = {}
+    for label, quantile in [('short', 0.1), ('median', 0.5), ('long', 1.0)]:
+        length = lengths[min(len(lengths) - 1, int(quantile * len(lengths)))]
+        picks[label] = next(career for career in careers if len(career) == length)
+    return picks
+
+
+def pick_batch(careers, size):
+    # Every n-th career, so a batch has as many short and long ones as the data
+    step = max(1, len(careers) // size)
+    return [row for career in careers[::step][:size] for row in career]
+
+
+def lag_input(rows):
+    # The frame lag_features hands to add_lag_columns
+    df = rename(to_df(rows)).drop(columns=["goalsConceded", "cleanSheets"])
+    return df.set_index(["name_player", "year"]).sort_index()
+
+
+def cases(predictor, careers, sizes):
+    """
+    (name, function, parameter) of every benchmark
+    """
+    for label, career in pick_careers(careers).items():
+        suffix = f"{label}-{len(career)}y"
+        by_year = to_df(career).sort_values(by=['year'])
+        filled = fill_years(by_year)
+        indexed = lag_input(career)
+        last = predictor.lag_features(career).iloc[-1:]
+        yield f"obj_to_df[{suffix}]", obj_to_df, career
+        yield f"fill_years[{suffix}]", fill_years, by_year
+        yield f"rename[{suffix}]", rename, filled
+        yield (f"add_lag_columns[{suffix}]",
+               lambda df: PlayerPredictor.add_lag_columns(df, columns=predictor.target_cols, levels=[1, 2]), indexed)
+        yield f"step_row[{suffix}]", predictor.step_row, last
+        yield f"pred_player_lag[{suffix}]", predictor.pred_player_lag, career
+
+    for size in sizes:
+        batch = pick_batch(careers, size)
+        indexed = lag_input(batch)
+        yield (f"add_lag_columns[batch-{size}]",
+               lambda df: PlayerPredictor.add_lag_columns(df, columns=predictor.target_cols, levels=[1, 2]), indexed)
+        yield f"pred_batch[batch-{size}]", predictor.pred_batch, batch
+
+
+def measure(function, argument, repeat, min_time):
+    """
+    Seconds per call (min and median of `repeat` runs of at least min_time
+    each) and the peak of the memory allocated by one call
+    """
+    timer = timeit.Timer(lambda: function(argument))
+    # Warm up, then call often enough for every run to last min_time
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    runs = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        function(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'calls': number * repeat,
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'peak_bytes': max(peak - start, 0),
+    }
+
+
+def regressions(results, baseline, threshold):
+    """
+    (name, metric, baseline value, value) of every benchmark slower, or
+    allocating more, than threshold times its baseline
+    """
+    found = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ['median', 'peak_bytes']:
+            if previous[metric] and result[metric] > previous[metric] * (1 + threshold):
+                found.append((name, metric, previous[metric], result[metric]))
+    return found
+
+
+class Command(BaseCommand):
+    help = "Time the predictors over short, median and long careers and batches, and compare with a baseline"
+
+    def add_arguments(self, parser):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+        parser.add_argument('--players', default=os.path.join(data_path, 'players.csv'),
+                            help="Careers the benchmarks are run over")
+        parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                            default=[1, 10, 100, 1000], help="Players per batch, comma separated")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+        parser.add_argument('--min-time', type=float, default=0.2, help="Seconds every timed run lasts at least")
+        parser.add_argument('--filter', default='', help="Only run the benchmarks whose name contains this")
+        parser.add_argument('--output', default='predictors-benchmark.json', help="File the results are written to")
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'predictors-baseline.json'),
+                            help="Results the run is compared with")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Fail when a median time or peak allocation grows by more than this fraction")
+        parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+
+    def handle(self, *args, **options):
+        predictor = get_predictor()
+        careers = load_careers(options['players'])
+
+        results = {}
+        print(f"{'benchmark':<36}{'calls':>8}{'min ms':>10}{'median ms':>11}{'peak KiB':>10}")
+        for name, function, argument in cases(predictor, careers, options['sizes']):
+            if options['filter'] not in name:
+                continue
+            results[name] = measure(function, argument, options['repeat'], options['min_time'])
+            result = results[name]
+            print(f"{name:<36}{result['calls']:>8}{result['min'] * 1000:>10.3f}{result['median'] * 1000:>11.3f}"
+                  f"{result['peak_bytes'] / 1024:>10.1f}")
+
+        run = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'model_version': model_version(),
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Results written to {options['output']}")
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as f:
+                json.dump(run, f, indent=2)
+            print(f"Baseline saved to {options['baseline']}")
+            return
+
+        if not os.path.exists(options['baseline']):
+            print(f"No baseline at {options['baseline']}, store one with --save-baseline")
+            return
+
+        with open(options['baseline'], 'r') as f:
+            baseline = json.load(f)
+        if baseline['model_version'] != run['model_version']:
+            print(f"The baseline was measured with model {baseline['model_version']}, not {run['model_version']}")
+
+        found = regressions(results, baseline['results'], options['threshold'])
+        for name, metric, previous, value in found:
+            print(f"REGRESSION {name} {metric}: {previous:.6g} -> {value:.6g} ({(value / previous - 1) * 100:+.0f}%)")
+        if found:
+            raise CommandError(f"{len(found)} benchmarks regressed by more than {options['threshold']:.0%} "
+                               f"against {options['baseline']}")
+        print(f"No regression beyond {options['threshold']:.0%} against {options['baseline']}")
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from djangoProject3.models import League, User
+
+
+def pages():
+    league = League.objects.values_list('name', flat=True).first()
+    return ['/', '/request', '/history', '/user_profile', f'/catalog?league={league}']
+
+
+class Command(BaseCommand):
+    help = "Queries per page of a logged in user, with the database session engine and the configured one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help="User browsing the pages (default: the first one)")
+        parser.add_argument('--repeat', type=int, default=3, help="Times every page is loaded, the first one warms up")
+
+    def handle(self, *args, **options):
+        user = User.objects.get(email=options['email']) if options['email'] else User.objects.first()
+        engines = ['django.contrib.sessions.backends.db', settings.SESSION_ENGINE]
+
+        results = {}
+        for engine in engines:
+            with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['*']):
+                client = Client()
+                session = client.session
+                session['email'] = user.email
+                session['user_id'] = user.id
+                session.save()
+                client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+                try:
+                    for page in pages():
+                        for _ in range(options['repeat']):
+                            with CaptureQueriesContext(connection) as queries:
+                                client.get(page)
+                        results[engine, page] = (
+                            len(queries),
+                            sum('django_session' in query['sql'] for query in queries.captured_queries),
+                        )
+                finally:
+                    session.delete()
+
+        print(f"{'page':<32}" + "".join(f"{engine.rsplit('.', 1)[1]:>24}" for engine in engines))
+        for page in pages():
+            print(f"{page:<32}" + "".join(
+                f"{'%d queries, %d session' % results[engine, page]:>24}" for engine in engines))
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+
+from collections import defaultdict
+import csv
+import os
+import random
+
+
+PLAYER_COLUMNS = ['namePlayer', 'age', 'role', 'valuePlayer', 'nameTeam', 'year', 'games', 'goals', 'assists',
+                  'minutes', 'nameLeague', 'goalsConceded', 'cleanSheets']
+SQUAD_COLUMNS = ['nameTeam', 'avgAge', 'valueTeam', 'year', 'numberPlayers', 'nameLeague']
+
+
+def jitter(rng, value, spread, low=0):
+    """
+    `value` moved by up to +-spread of itself, kept in the column's type
+    """
+    if value in ('', None):
+        return value
+    number = float(value)
+    moved = max(low, number * rng.uniform(1 - spread, 1 + spread))
+    return round(moved, 1) if '.' in str(value) else int(round(moved))
+
+
+class Command(BaseCommand):
+    help = "Grow players.csv/squads.csv by --scale with synthetic leagues, teams and careers, for load tests"
+
+    def add_arguments(self, parser):
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+        parser.add_argument('--squads', default=os.path.join(data_path, 'squads.csv'))
+        parser.add_argument('--players', default=os.path.join(data_path, 'players.csv'))
+        parser.add_argument('--scale', type=int, default=10, help="Times the original data, 10 to 100")
+        parser.add_argument('--output', help="Directory written squads.csv/players.csv to (default: data-x<scale>)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        options['output'] = options['output'] or f"data-x{options['scale']}"
+        os.makedirs(options['output'], exist_ok=True)
+
+        with open(options['squads'], 'r') as f:
+            squads = list(csv.DictReader(f))
+        with open(options['players'], 'r') as f:
+            players = list(csv.DictReader(f))
+
+        # Every career is replayed under a new name in every copy, so the
+        # transfers between teams and the shape of the careers stay plausible
+        careers = defaultdict(list)
+        for row in players:
+            careers[row['namePlayer']].append(row)
+        first_names = sorted({name.split(' ', 1)[0] for name in careers if ' ' in name})
+        last_names = sorted({name.split(' ', 1)[1] for name in careers if ' ' in name})
+        used = set(careers)
+
+        def new_name():
+            while True:
+                name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+                if name not in used:
+                    used.add(name)
+                    return name
+
+        squad_rows = player_rows = 0
+        with open(os.path.join(options['output'], 'squads.csv'), 'w', newline='') as squads_file, \
+                open(os.path.join(options['output'], 'players.csv'), 'w', newline='') as players_file:
+            squads_csv = csv.DictWriter(squads_file, SQUAD_COLUMNS)
+            players_csv = csv.DictWriter(players_file, PLAYER_COLUMNS)
+            squads_csv.writeheader()
+            players_csv.writeheader()
+
+            for copy in range(options['scale']):
+                # The first copy is the original data, the others are new leagues of the same countries
+                league = (lambda name: name) if copy == 0 else (lambda name: f"{name}-{copy + 1}")
+                team = (lambda name: name) if copy == 0 else (lambda name: f"{name} {copy + 1}")
+
+                for row in squads:
+                    squads_csv.writerow(row if copy == 0 else dict(
+                        row, nameTeam=team(row['nameTeam']), nameLeague=league(row['nameLeague']),
+                        avgAge=jitter(rng, row['avgAge'], 0.05), valueTeam=jitter(rng, row['valueTeam'], 0.3)))
+                    squad_rows += 1
+
+                for name, career in careers.items():
+                    renamed = name if copy == 0 else new_name()
+                    age_shift = 0 if copy == 0 else rng.randint(-2, 2)
+                    for row in career:
+                        if copy:
+                            row = dict(
+                                row, namePlayer=renamed, nameTeam=team(row['nameTeam']),
+                                nameLeague=league(row['nameLeague']),
+                                age=int(row['age']) + age_shift if int(row['age']) > 0 else row['age'],
+                                valuePlayer=jitter(rng, row['valuePlayer'], 0.3),
+                                games=jitter(rng, row['games'], 0.2), goals=jitter(rng, row['goals'], 0.3),
+                                assists=jitter(rng, row['assists'], 0.3), minutes=jitter(rng, row['minutes'], 0.2),
+                                goalsConceded=jitter(rng, row['goalsConceded'], 0.3),
+                                cleanSheets=jitter(rng, row['cleanSheets'], 0.3))
+                        players_csv.writerow(row)
+                        player_rows += 1
+
+                print(f"Copy {copy + 1}/{options['scale']}: {squad_rows} squads, {player_rows} players")
+
+        print(f"Load it with: manage.py parseData --squads {options['output']}/squads.csv "
+              f"--players {options['output']}/players.csv")
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from djangoProject3.inference import MicroBatcher
+from djangoProject3.predictors import get_predictor, preload_predictor, model_version
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+
+
+def handler(batcher, timeout):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/health':
+                self.send_error(404)
+                return
+            self.reply(200, {'model_version': model_version(), 'batches': batcher.batches,
+                             'forecasts': batcher.forecasts})
+
+        def do_POST(self):
+            if self.path != '/forecast':
+                self.send_error(404)
+                return
+            try:
+                rows = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['rows']
+                self.reply(200, {'forecast': batcher.submit(rows).result(timeout)})
+            except Exception as e:
+                self.reply(500, {'error': str(e)})
+
+        def reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return InferenceHandler
+
+
+class Command(BaseCommand):
+    help = "Serve player forecasts over HTTP from one copy of the model, batching concurrent requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--window', type=float, default=0.01,
+                            help="Seconds concurrent forecasts are collected into one batch")
+        parser.add_argument('--max-batch', type=int, default=64, help="Players forecast per batch at most")
+        parser.add_argument('--timeout', type=float, default=30, help="Seconds a request waits for its batch")
+
+    def handle(self, *args, **options):
+        preload_predictor()
+        batcher = MicroBatcher(get_predictor(), options['window'], options['max_batch'])
+        server = ThreadingHTTPServer((options['host'], options['port']), handler(batcher, options['timeout']))
+        print(f"Serving model {model_version()} on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
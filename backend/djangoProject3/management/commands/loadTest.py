@@ -0,0 +1,308 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+
+SCENARIOS = ['catalog', 'history', 'login', 'forecast']
+TARGETS = ['value_player', 'goals', 'assists', 'games_played', 'minute_played']
+
+
+def parse_mix(value):
+    """
+    {scenario: weight} of a "catalog=50,history=10,login=5,forecast=35" mix
+    """
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is the answer under test, not a page to load as well
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Results:
+    """
+    Latencies and errors of every endpoint, shared by the workers
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, elapsed, status):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            self.statuses.setdefault(endpoint, {}).setdefault(status, 0)
+            self.statuses[endpoint][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, duration):
+        rows = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors.get(endpoint, 0),
+                'rps': len(values) / duration,
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99),
+                'max': values[-1],
+                'statuses': {str(status): count for status, count in self.statuses[endpoint].items()},
+            }
+        return rows
+
+
+class Client:
+    """
+    A browser of the app: its own cookies, CSRF token and catalog ETags
+    """
+
+    def __init__(self, url, results, timeout):
+        self.url = url
+        self.results = results
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+        self.etags = {}
+        # Catalog levels already loaded, reused when the server answers 304
+        self.cascade = {}
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return None
+
+    def send(self, endpoint, path, data=None, headers=None):
+        """
+        (status, body) of one request, timed under `endpoint`. The status is
+        the exception name when the request did not get an answer.
+        """
+        body = urlencode(data).encode('utf-8') if data is not None else None
+        req = urllib.request.Request(self.url + path, data=body, headers=headers or {})
+        if body is not None:
+            req.add_header('Referer', self.url + path)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, content, response_headers = response.status, response.read(), response.headers
+        except HTTPError as e:
+            status, content, response_headers = e.code, e.read(), e.headers
+        except (URLError, OSError) as e:
+            status, content, response_headers = type(e).__name__, b"", {}
+        if endpoint:
+            self.results.add(endpoint, time.perf_counter() - start, status)
+        if response_headers and response_headers.get('ETag'):
+            self.etags[path] = response_headers['ETag']
+        return status, content
+
+    def login(self, email, password):
+        if self.csrf_token() is None:
+            self.send(None, '/login')
+        status, _ = self.send('login', '/login', {
+            'email': email,
+            'password': password,
+            'csrfmiddlewaretoken': self.csrf_token() or '',
+        })
+        return status == 302
+
+    def catalog(self, *levels):
+        path = '/catalog?' + urlencode(dict(zip(['league', 'year', 'team'], levels)))
+        headers = {'If-None-Match': self.etags[path]} if path in self.etags else {}
+        status, content = self.send('catalog', path, headers=headers)
+        if status == 200:
+            return json.loads(content)['items']
+        return None
+
+
+def pick_player(client, rng):
+    """
+    (league, year, team, player) reached through the catalog cascade like
+    the request page does, None if a level came back empty
+    """
+    levels = []
+    for _ in range(4):
+        items = client.catalog(*levels)
+        if items is None:
+            # Not modified, the cascade of a browser goes on from its cache
+            items = client.cascade.get(tuple(levels))
+        else:
+            client.cascade[tuple(levels)] = items
+        if not items:
+            return None
+        levels.append(rng.choice(items))
+    return tuple(levels)
+
+
+def worker(url, results, options, mix, deadline, seed):
+    rng = random.Random(seed)
+    client = Client(url, results, options['timeout'])
+    client.login(options['email'], options['password'])
+
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        scenario = rng.choices(names, weights)[0]
+        if scenario == 'catalog':
+            pick_player(client, rng)
+        elif scenario == 'history':
+            client.send('history', '/history')
+        elif scenario == 'login':
+            client.login(options['email'], options['password'])
+        else:
+            picked = pick_player(client, rng)
+            if picked:
+                league, year, team, player = picked
+                client.send('forecast', '/request', {
+                    'create_model': '1',
+                    'target': rng.choice(TARGETS),
+                    'championship': league,
+                    'year': year,
+                    'squad': team,
+                    'player': player,
+                })
+
+
+class Command(BaseCommand):
+    help = "Drive a mix of catalog, history, login and forecast requests at the app and report latencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="App already running (default: start one on --port)")
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--server', choices=['runserver', 'uvicorn'], default='runserver',
+                            help="How the app is started: manage.py runserver (WSGI) or uvicorn (ASGI)")
+        parser.add_argument('--workers', type=int, default=1, help="uvicorn worker processes")
+        parser.add_argument('--server-log', default=os.devnull, help="File the output of the started app goes to")
+        parser.add_argument('--concurrency', type=int, default=8, help="Simulated users")
+        parser.add_argument('--duration', type=float, default=30, help="Seconds the load lasts")
+        parser.add_argument('--mix', type=parse_mix, default=parse_mix('catalog=50,history=10,login=5,forecast=35'),
+                            help="Weights of the scenarios")
+        parser.add_argument('--email', default='loadtest@example.com', help="User the simulated users log in as")
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--timeout', type=float, default=30, help="Seconds before a request counts as failed")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', metavar='FILE', help="Also write the results to FILE")
+
+    def handle(self, *args, **options):
+        server = None
+        url = options['url']
+        if not url:
+            url = f"http://127.0.0.1:{options['port']}"
+            server = self.start_server(options)
+        url = url.rstrip('/')
+
+        try:
+            self.wait_for(url, server)
+            self.create_user(url, options)
+
+            results = Results()
+            deadline = time.monotonic() + options['duration']
+            threads = [
+                threading.Thread(target=worker, args=(url, results, options, options['mix'], deadline,
+                                                      options['seed'] + i), daemon=True)
+                for i in range(options['concurrency'])
+            ]
+            start = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duration = time.monotonic() - start
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        self.report(results.summary(duration), duration, options)
+
+    def start_server(self, options):
+        manage = str(settings.BASE_DIR / 'manage.py')
+        if options['server'] == 'uvicorn':
+            command = [sys.executable, '-m', 'uvicorn', 'djangoProject3.asgi:application', '--port',
+                       str(options['port']), '--workers', str(options['workers']), '--no-access-log']
+        else:
+            command = [sys.executable, manage, 'runserver', '--noreload', str(options['port'])]
+        log = open(options['server_log'], 'a')
+        print(f"Starting {' '.join(command)}")
+        return subprocess.Popen(command, cwd=str(settings.BASE_DIR), stdout=log, stderr=subprocess.STDOUT)
+
+    def wait_for(self, url, server, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError(f"The app exited with status {server.returncode}, see --server-log")
+            try:
+                urllib.request.urlopen(url + '/login', timeout=5).read()
+                return
+            except (URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError(f"{url} did not answer within {timeout}s")
+
+    def create_user(self, url, options):
+        # Registering an existing user only fails, so the load test can be run again
+        client = Client(url, Results(), options['timeout'])
+        client.send(None, '/register')
+        client.send(None, '/register', {
+            'email': options['email'],
+            'password': options['password'],
+            'repeat_password': options['password'],
+            'csrfmiddlewaretoken': client.csrf_token() or '',
+        })
+        if not client.login(options['email'], options['password']):
+            raise CommandError(f"Could not log in as {options['email']}")
+
+    def report(self, rows, duration, options):
+        total = sum(row['requests'] for row in rows.values())
+        errors = sum(row['errors'] for row in rows.values())
+
+        print(f"{options['concurrency']} users for {duration:.1f}s: {total} requests, {total / duration:.1f} req/s, "
+              f"{errors} errors")
+        print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for endpoint, row in rows.items():
+            print(f"{endpoint:<10}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}"
+                  + "".join(f"{row[key] * 1000:>9.1f}" for key in ['p50', 'p95', 'p99', 'max']))
+        for endpoint, row in rows.items():
+            failed = {status: count for status, count in row['statuses'].items()
+                      if not status.isdigit() or int(status) >= 400}
+            if failed:
+                print(f"{endpoint} failures: {failed}")
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({
+                    'concurrency': options['concurrency'],
+                    'duration': duration,
+                    'mix': options['mix'],
+                    'requests': total,
+                    'errors': errors,
+                    'rps': total / duration,
+                    'endpoints': rows,
+                }, f, indent=2)
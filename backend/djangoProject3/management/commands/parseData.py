@@ -1,31 +1,74 @@
 from django.core.management.base import BaseCommand
-from djangoProject3.models import Player_Status
-from djangoProject3.models import Team_Status
+from djangoProject3.ingest import Ingest
+from djangoProject3.forecast_cache import bump_dataset_version
 
 import csv
 import os
 
 
-class Command(BaseCommand):
+def readCsv(path):
+    with open(path, 'r') as f:
+        yield from csv.DictReader(f)
 
-    def handle(self, *args, **options):
 
+def readParquet(path):
+    """
+    Rows of a Parquet export of the scraper, one league/season partition
+    directory after the other, without loading it whole
+    """
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    for batch in dataset.to_batches():
+        yield from batch.to_pylist()
+
+
+class Command(BaseCommand):
+    help = "Load squads.csv and players.csv, updating the rows that are already loaded"
+
+    def add_arguments(self, parser):
         # Get the path to the data folder
         data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 
-        with open(os.path.join(data_path, 'squads.csv'), 'r') as f:
-            teams = Team_Status.objects.bulk_create(map(lambda row: Team_Status(**row), csv.DictReader(f)))
+        parser.add_argument('--squads', default=os.path.join(data_path, 'squads.csv'))
+        parser.add_argument('--players', default=os.path.join(data_path, 'players.csv'))
+        parser.add_argument('--parquet', metavar='DIR',
+                            help="Load the squads/ and players/ Parquet export of the scraper in DIR instead")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows read, and committed, at a time")
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only apply the league/season partitions that changed since the last incremental load "
+                                 "of the same files")
+        parser.add_argument('--full-snapshot', action='store_true',
+                            help="With --incremental, the files hold all the data: empty the league/season "
+                                 "partitions they lack")
+
+    def handle(self, *args, **options):
+        ingest = Ingest(batch_size=options['batch_size'])
+
+        if options['parquet']:
+            squads = os.path.join(options['parquet'], 'squads')
+            players = os.path.join(options['parquet'], 'players')
+            read, format = readParquet, 'parquet'
+        else:
+            squads, players, read, format = options['squads'], options['players'], readCsv, 'csv'
+
+        if options['incremental']:
+            snapshot = options['full_snapshot']
+            changed = ingest.teams_delta(squads, read, format, snapshot)
+            changed = ingest.players_delta(players, read, format, snapshot) or changed
+            if changed:
+                bump_dataset_version()
+            else:
+                print("Nothing to do, no row changed")
+            return
 
-        print(f"Team_Status table populated: {len(teams)} rows")
+        teams = ingest.teams(read(squads))
 
-        def parsePlayerRow(row: dict) -> dict:
-            for san in ["goalsConceded", "goals", "assists", "cleanSheets"]:
-                if row[san] == "":
-                    row[san] = 0
-            return Player_Status(**row)
+        print(f"Team_Status table populated: {teams} rows")
 
-        with open(os.path.join(data_path, 'players.csv'), 'r') as f:
-            players = Player_Status.objects.bulk_create(map(parsePlayerRow, csv.DictReader(f)))
+        players = ingest.players(read(players))
 
-        print(f"Player_Status table populated: {len(players)} rows")
+        print(f"Player_Status table populated: {players} rows")
 
+        bump_dataset_version()
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from djangoProject3.models import Player_Status
+from djangoProject3.models import Player_Forecast
+from djangoProject3.models import League, Player, Team
+from djangoProject3.forecast_cache import dataset_version
+from djangoProject3.predictors import get_predictor, preload_predictor, model_version
+
+from multiprocessing import Pool
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def forecastChunk(history: pd.DataFrame) -> pd.DataFrame:
+    return get_predictor().pred_batch(history)
+
+
+class Command(BaseCommand):
+    help = "Precompute the forecast of every player into Player_Forecast"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                            help="Worker processes (default: number of cores)")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Players forecast per batch")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        version = model_version()
+        # Read before the history, a reload while forecasting leaves the rows stale
+        data_version = dataset_version()
+
+        history = pd.DataFrame(Player_Status.objects.with_names())
+        names = history.namePlayer.unique()
+        chunks = [
+            history[history.namePlayer.isin(part)]
+            for part in np.array_split(names, max(1, math.ceil(len(names) / options['chunk_size'])))
+        ]
+
+        # Load the model before forking so every worker shares it, and do not
+        # hand the parent's database connection to the children.
+        preload_predictor()
+        connections.close_all()
+
+        with Pool(processes=options['processes']) as pool:
+            forecasts = pool.map(forecastChunk, chunks)
+
+        print(f"Forecast {len(names)} players in {time.time() - start:.1f}s "
+              f"using {options['processes']} processes")
+
+        players = dict(Player.objects.values_list('name', 'id'))
+        teams = dict(Team.objects.values_list('name', 'id'))
+        leagues = dict(League.objects.values_list('name', 'id'))
+
+        def toForecast(row) -> Player_Forecast:
+            return Player_Forecast(
+                player_id=players[row.name_player],
+                modelVersion=version,
+                datasetVersion=data_version,
+                year=row.year,
+                age=None if pd.isna(row.age) else row.age,
+                valuePlayer=row.value_player,
+                games=row.games_played,
+                goals=row.goals,
+                assists=row.assists,
+                minutes=row.minute_played,
+                role=row.role,
+                team_id=teams[row.squad_name],
+                league_id=leagues[row.championship],
+            )
+
+        with transaction.atomic():
+            # The rows of older dataset versions are never served again
+            Player_Forecast.objects.filter(modelVersion=version).delete()
+            rows = Player_Forecast.objects.bulk_create(
+                (toForecast(row) for frame in forecasts for row in frame.itertuples(index=False)),
+                batch_size=1000,
+            )
+
+        print(f"Player_Forecast table populated: {len(rows)} rows for model {version} and data version {data_version}")
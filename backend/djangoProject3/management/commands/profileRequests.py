@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from djangoProject3.models import Profiling_Session
+
+from datetime import timedelta
+
+
+class Command(BaseCommand):
+    help = "Start or stop profiling live requests, as editing Profiling_Session in the admin does"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample-rate', type=float, default=0.01, help="Fraction of the requests profiled")
+        parser.add_argument('--slower-than', type=float,
+                            help="Only keep the profiles of the requests slower than this, in seconds")
+        parser.add_argument('--minutes', type=float, default=30, help="Minutes the profiling lasts")
+        parser.add_argument('--stop', action='store_true', help="Stop profiling")
+        parser.add_argument('--status', action='store_true', help="Only show the current session")
+
+    def handle(self, *args, **options):
+        if not options['status']:
+            until = None if options['stop'] else timezone.now() + timedelta(minutes=options['minutes'])
+            Profiling_Session.objects.update_or_create(pk=1, defaults={
+                'sample_rate': options['sample_rate'],
+                'slower_than': options['slower_than'],
+                'until': until,
+            })
+
+        session = Profiling_Session.objects.filter(pk=1).first()
+        if session is None or session.until is None or session.until <= timezone.now():
+            print("Profiling off")
+        else:
+            kept = f", keeping those slower than {session.slower_than}s" if session.slower_than is not None else ""
+            print(f"Profiling {session.sample_rate:.2%} of the requests{kept} until {session.until}; "
+                  f"processes notice within their PROFILING_CHECK_INTERVAL")
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from djangoProject3.profiling import load
+
+from collections import Counter
+import os
+
+
+def trim(stack, root):
+    """
+    The frames of a folded stack from the first one naming `root` on, so the
+    server and middleware frames above the views are left out. Pool threads
+    are kept from their label on, and the other stacks are reduced to the
+    function they were in.
+    """
+    frames = stack.split(';')
+    if frames[0].startswith('['):
+        return frames
+    for i, frame in enumerate(frames):
+        if root in frame:
+            return frames[i:]
+    return [f"(outside {root})", frames[-1]]
+
+
+def tree(stacks):
+    """
+    Nested {frame: [samples, children]} of the folded stacks
+    """
+    root = {}
+    for frames, count in stacks.items():
+        level = root
+        for frame in frames:
+            node = level.setdefault(frame, [0, {}])
+            node[0] += count
+            level = node[1]
+    return root
+
+
+def print_tree(level, total, min_percent, depth, indent=0):
+    for frame, (count, children) in sorted(level.items(), key=lambda item: -item[1][0]):
+        percent = 100 * count / total
+        if percent < min_percent:
+            continue
+        print(f"{percent:6.1f}% {'  ' * indent}{frame}")
+        if indent + 1 < depth:
+            print_tree(children, total, min_percent, depth, indent + 1)
+
+
+class Command(BaseCommand):
+    help = "Aggregate the profiles of live requests into a flame graph style tree and the hottest functions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.PROFILING_DIR, help="Profiles written by ProfilingMiddleware")
+        parser.add_argument('--view', help="Only the profiles of this view (URL name)")
+        parser.add_argument('--root', default='djangoProject3.views.',
+                            help="Start the stacks at the first frame containing this (empty: whole stacks)")
+        parser.add_argument('--min-percent', type=float, default=1.0, help="Hide the frames under this share")
+        parser.add_argument('--depth', type=int, default=25, help="Levels of the tree shown")
+        parser.add_argument('--top', type=int, default=15, help="Hottest functions listed")
+        parser.add_argument('--folded', metavar='FILE',
+                            help="Also write the merged folded stacks, for flamegraph.pl or speedscope")
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['dir']):
+            raise CommandError(f"No profiles in {options['dir']}")
+        profiles = load(options['dir'], options['view'])
+        if not profiles:
+            raise CommandError(f"No profiles{' of ' + options['view'] if options['view'] else ''} in {options['dir']}")
+
+        print(f"{'view':<20}{'profiles':>10}{'mean ms':>10}{'max ms':>10}")
+        for view in sorted({profile['view'] for profile in profiles}):
+            seconds = [profile['seconds'] for profile in profiles if profile['view'] == view]
+            print(f"{view:<20}{len(seconds):>10}{1000 * sum(seconds) / len(seconds):>10.1f}{1000 * max(seconds):>10.1f}")
+
+        stacks = Counter()
+        for profile in profiles:
+            stacks.update(profile['stacks'])
+        total = sum(stacks.values())
+        if not total:
+            raise CommandError("The profiles hold no samples, the requests were shorter than PROFILING_INTERVAL")
+
+        if options['folded']:
+            with open(options['folded'], 'w') as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            print(f"Folded stacks written to {options['folded']}")
+
+        trimmed = Counter()
+        for stack, count in stacks.items():
+            trimmed[tuple(trim(stack, options['root']) if options['root'] else stack.split(';'))] += count
+
+        own = Counter()
+        inclusive = Counter()
+        for frames, count in trimmed.items():
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        print(f"\n{total} samples, one every {profiles[0]['interval'] * 1000:g} ms")
+        print(f"\n{'self %':>7} {'total %':>7}  function")
+        for frame, count in own.most_common(options['top']):
+            print(f"{100 * count / total:>7.1f} {100 * inclusive[frame] / total:>7.1f}  {frame}")
+
+        print("\nSamples per call path:")
+        print_tree(tree(trimmed), total, options['min_percent'], options['depth'])
@@ -0,0 +1,210 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import connections
+from django.db.backends.signals import connection_created
+import bisect
+import threading
+import time
+
+
+# Upper bounds of the buckets, in seconds and in queries
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Endpoint label of the spans run outside of a request, e.g. by the audit writer
+BACKGROUND = 'background'
+
+
+class Histogram:
+    """
+    Prometheus histogram: observations per bucket, their sum and count
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Family:
+    """
+    Histograms of one metric, one per combination of label values
+    """
+
+    def __init__(self, name, help, labels, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = Histogram(self.buckets)
+            series.observe(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                labels = ",".join(f'{label}="{escape(value)}"' for label, value in zip(self.labels, values))
+                total = 0
+                for bound, count in zip(self.buckets + ('+Inf',), series.counts):
+                    total += count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {total}')
+                lines.append(f"{self.name}_sum{{{labels}}} {series.sum}")
+                lines.append(f"{self.name}_count{{{labels}}} {series.count}")
+        return lines
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_seconds = Family('ccbda_request_seconds', "Time to answer a request, until its first byte",
+                         ('endpoint', 'method', 'status'))
+stage_seconds = Family('ccbda_stage_seconds', "Time spent in a stage of a request, summed over the request",
+                       ('endpoint', 'stage'))
+request_queries = Family('ccbda_request_queries', "Database queries per request", ('endpoint',), QUERIES_BUCKETS)
+request_db_seconds = Family('ccbda_request_db_seconds', "Time spent in database queries per request", ('endpoint',))
+password_seconds = Family('ccbda_password_seconds', "Time to hash or check a password with bcrypt at the current cost",
+                          ('operation',))
+
+FAMILIES = [request_seconds, stage_seconds, request_queries, request_db_seconds, password_seconds]
+
+
+class RequestTiming:
+    """
+    Stage times, queries and database time of the request being answered.
+    The ORM of an async view and the inference pool run on other threads,
+    which is why the counters are locked.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_query(self, seconds):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+
+    def finish(self, request, response):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.url_name if match and match.url_name else 'unmatched'
+        request_seconds.observe(time.perf_counter() - self.start, endpoint, request.method, str(response.status_code))
+        request_queries.observe(self.queries, endpoint)
+        request_db_seconds.observe(self.db_seconds, endpoint)
+        for stage, seconds in self.stages.items():
+            stage_seconds.observe(seconds, endpoint, stage)
+
+
+_current = ContextVar('request_timing', default=None)
+
+
+@contextmanager
+def span(stage):
+    """
+    Time the block as `stage` of the current request, or of the background
+    work when no request is being answered
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        timing = _current.get()
+        if timing is None:
+            stage_seconds.observe(seconds, BACKGROUND, stage)
+        else:
+            timing.add_stage(stage, seconds)
+
+
+def _time_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(time.perf_counter() - start)
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    # Sent on every connect, the wrapper stays when a connection is reopened
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+connection_created.connect(_install_wrapper)
+# Connections of this thread opened before, e.g. by the checks of runserver
+for _connection in connections.all(initialized_only=True):
+    _install_wrapper(None, _connection)
+
+
+class MetricsMiddleware:
+    """
+    Times every request, with its queries and the spans run while answering
+    it, into the histograms of /metrics. Put it first in MIDDLEWARE so the
+    session and authentication middleware are counted as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        timing.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        timing.finish(request, response)
+        return response
+
+
+def render(values=()):
+    """
+    Every histogram in the Prometheus text format, followed by the
+    (name, type, help, value) counters and gauges of `values`
+    """
+    lines = []
+    for family in FAMILIES:
+        lines.extend(family.render())
+    for name, kind, help, value in values:
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
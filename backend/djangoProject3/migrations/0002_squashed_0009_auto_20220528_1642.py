@@ -0,0 +1,56 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('djangoProject3', '0002_auto_20220528_1421'),
+        ('djangoProject3', '0003_auto_20220528_1425'),
+        ('djangoProject3', '0004_request'),
+        ('djangoProject3', '0005_rename_user_id_request_user'),
+        ('djangoProject3', '0006_request_target'),
+        ('djangoProject3', '0007_alter_user_created_at'),
+        ('djangoProject3', '0008_auto_20220528_1639'),
+        ('djangoProject3', '0009_auto_20220528_1642'),
+    ]
+
+    dependencies = [
+        ('djangoProject3', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(max_length=254, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(max_length=250, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Request',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=50, null=True)),
+                ('nameLeague', models.CharField(max_length=50)),
+                ('year', models.PositiveIntegerField()),
+                ('nameTeam', models.CharField(max_length=50)),
+                ('namePlayer', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='djangoProject3.user')),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0002_squashed_0009_auto_20220528_1642'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Player_Forecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namePlayer', models.CharField(max_length=50)),
+                ('modelVersion', models.CharField(max_length=64)),
+                ('year', models.PositiveIntegerField()),
+                ('age', models.FloatField(null=True)),
+                ('valuePlayer', models.FloatField()),
+                ('games', models.FloatField()),
+                ('goals', models.FloatField()),
+                ('assists', models.FloatField()),
+                ('minutes', models.FloatField()),
+                ('role', models.CharField(max_length=100)),
+                ('nameTeam', models.CharField(max_length=50)),
+                ('nameLeague', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='player_forecast',
+            constraint=models.UniqueConstraint(fields=('namePlayer', 'modelVersion', 'year'), name='unique_player_forecast'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0010_player_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dataset_Version',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0011_dataset_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='League',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Player',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='player_forecast',
+            name='league',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AddField(
+            model_name='player_forecast',
+            name='player',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='djangoProject3.player'),
+        ),
+        migrations.AddField(
+            model_name='player_forecast',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AddField(
+            model_name='player_status',
+            name='league',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AddField(
+            model_name='player_status',
+            name='player',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.player'),
+        ),
+        migrations.AddField(
+            model_name='player_status',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='league',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='player',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.player'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AddField(
+            model_name='team_status',
+            name='league',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AddField(
+            model_name='team_status',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+# (model, foreign key, name column, dimension model)
+REFERENCES = [
+    ('Player_Status', 'player', 'namePlayer', 'Player'),
+    ('Player_Status', 'team', 'nameTeam', 'Team'),
+    ('Player_Status', 'league', 'nameLeague', 'League'),
+    ('Team_Status', 'team', 'nameTeam', 'Team'),
+    ('Team_Status', 'league', 'nameLeague', 'League'),
+    ('Request', 'player', 'namePlayer', 'Player'),
+    ('Request', 'team', 'nameTeam', 'Team'),
+    ('Request', 'league', 'nameLeague', 'League'),
+    ('Player_Forecast', 'player', 'namePlayer', 'Player'),
+    ('Player_Forecast', 'team', 'nameTeam', 'Team'),
+    ('Player_Forecast', 'league', 'nameLeague', 'League'),
+]
+
+
+def backfill(apps, schema_editor):
+    names = {}
+    for model, _, column, dimension in REFERENCES:
+        rows = apps.get_model('djangoProject3', model).objects.values_list(column, flat=True).distinct()
+        names.setdefault(dimension, set()).update(rows)
+
+    for dimension, values in names.items():
+        apps.get_model('djangoProject3', dimension).objects.bulk_create(
+            [apps.get_model('djangoProject3', dimension)(name=value) for value in sorted(values)],
+            batch_size=1000,
+        )
+
+    # One UPDATE ... SET fk = (SELECT id FROM dimension WHERE name = column) per reference
+    for model, field, column, dimension in REFERENCES:
+        ids = apps.get_model('djangoProject3', dimension).objects.filter(name=OuterRef(column)).values('pk')[:1]
+        apps.get_model('djangoProject3', model).objects.update(**{field: Subquery(ids)})
+
+
+def restore_names(apps, schema_editor):
+    for model, field, column, _ in REFERENCES:
+        rows = apps.get_model('djangoProject3', model).objects
+        rows.update(**{column: Subquery(
+            rows.model._meta.get_field(field).related_model.objects.filter(pk=OuterRef(field)).values('name')[:1]
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0012_dimension_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, restore_names),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0013_backfill_dimension_tables'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='player_forecast',
+            name='unique_player_forecast',
+        ),
+        migrations.RemoveField(
+            model_name='player_forecast',
+            name='nameLeague',
+        ),
+        migrations.RemoveField(
+            model_name='player_forecast',
+            name='namePlayer',
+        ),
+        migrations.RemoveField(
+            model_name='player_forecast',
+            name='nameTeam',
+        ),
+        migrations.RemoveField(
+            model_name='player_status',
+            name='nameLeague',
+        ),
+        migrations.RemoveField(
+            model_name='player_status',
+            name='namePlayer',
+        ),
+        migrations.RemoveField(
+            model_name='player_status',
+            name='nameTeam',
+        ),
+        migrations.RemoveField(
+            model_name='request',
+            name='nameLeague',
+        ),
+        migrations.RemoveField(
+            model_name='request',
+            name='namePlayer',
+        ),
+        migrations.RemoveField(
+            model_name='request',
+            name='nameTeam',
+        ),
+        migrations.RemoveField(
+            model_name='team_status',
+            name='nameLeague',
+        ),
+        migrations.RemoveField(
+            model_name='team_status',
+            name='nameTeam',
+        ),
+        migrations.AlterField(
+            model_name='player_forecast',
+            name='league',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AlterField(
+            model_name='player_forecast',
+            name='player',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='djangoProject3.player'),
+        ),
+        migrations.AlterField(
+            model_name='player_forecast',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AlterField(
+            model_name='player_status',
+            name='league',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AlterField(
+            model_name='player_status',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.player'),
+        ),
+        migrations.AlterField(
+            model_name='player_status',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='league',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.player'),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AlterField(
+            model_name='team_status',
+            name='league',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.league'),
+        ),
+        migrations.AlterField(
+            model_name='team_status',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.AddIndex(
+            model_name='player_status',
+            index=models.Index(fields=['league', 'year', 'team'], name='player_status_league_year_team'),
+        ),
+        migrations.AddIndex(
+            model_name='team_status',
+            index=models.Index(fields=['league', 'year'], name='team_status_league_year'),
+        ),
+        migrations.AddConstraint(
+            model_name='player_forecast',
+            constraint=models.UniqueConstraint(fields=('player', 'modelVersion', 'year'), name='unique_player_forecast'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:35
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+
+def drop_duplicates(apps, schema_editor):
+    """Keep the last loaded row of every natural key"""
+    for model, key in [('Player_Status', ['player', 'team', 'year']), ('Team_Status', ['team', 'year'])]:
+        rows = apps.get_model('djangoProject3', model).objects
+        keep = rows.values(*key).annotate(last=Max('id')).values('last')
+        rows.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0014_drop_denormalized_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='player_status',
+            name='player',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.player'),
+        ),
+        migrations.AlterField(
+            model_name='team_status',
+            name='team',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='djangoProject3.team'),
+        ),
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='player_status',
+            constraint=models.UniqueConstraint(fields=('player', 'team', 'year'), name='unique_player_status'),
+        ),
+        migrations.AddConstraint(
+            model_name='team_status',
+            constraint=models.UniqueConstraint(fields=('team', 'year'), name='unique_team_status'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0015_natural_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingest_Checksum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50)),
+                ('partition', models.CharField(blank=True, max_length=100)),
+                ('checksum', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ingest_checksum',
+            constraint=models.UniqueConstraint(fields=('source', 'partition'), name='unique_ingest_checksum'),
+        ),
+    ]
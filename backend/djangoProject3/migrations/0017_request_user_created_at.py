@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0016_ingest_checksum'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='request',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='djangoProject3.user'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['user', 'created_at'], name='request_user_created_at'),
+        ),
+    ]
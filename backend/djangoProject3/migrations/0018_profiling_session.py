@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0017_request_user_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profiling_Session',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_rate', models.FloatField(default=0.01)),
+                ('slower_than', models.FloatField(blank=True, null=True)),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
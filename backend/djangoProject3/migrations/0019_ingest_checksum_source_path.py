@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:19
+
+from django.db import migrations, models
+
+
+def drop_unkeyed_checksums(apps, schema_editor):
+    # Checksums stored under the bare 'players'/'squads' labels belong to no
+    # file in particular, the next incremental load diffs against the table
+    Ingest_Checksum = apps.get_model('djangoProject3', 'Ingest_Checksum')
+    Ingest_Checksum.objects.filter(source__in=['players', 'squads']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0018_profiling_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingest_checksum',
+            name='source',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.RunPython(drop_unkeyed_checksums, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0019_ingest_checksum_source_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player_forecast',
+            name='datasetVersion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def seed(apps, schema_editor):
+    # The catalog's Last-Modified is the updated_at of this row, there from the start
+    apps.get_model('djangoProject3', 'Dataset_Version').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0020_player_forecast_dataset_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import Min
+
+import datetime
+
+
+def backfill(apps, schema_editor):
+    # Requests stored before created_at existed are older than every dated
+    # one, their ids keep them in order among themselves
+    Request = apps.get_model('djangoProject3', 'Request')
+    oldest = Request.objects.aggregate(oldest=Min('created_at'))['oldest']
+    Request.objects.filter(created_at__isnull=True).update(
+        created_at=oldest or datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0021_seed_dataset_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0022_backfill_request_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='request',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
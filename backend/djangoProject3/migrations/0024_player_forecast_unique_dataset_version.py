@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoProject3', '0023_request_created_at_not_null'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='player_forecast',
+            name='unique_player_forecast',
+        ),
+        migrations.AddConstraint(
+            model_name='player_forecast',
+            constraint=models.UniqueConstraint(fields=('player', 'modelVersion', 'datasetVersion', 'year'), name='unique_player_forecast_version'),
+        ),
+    ]
@@ -98,27 +98,97 @@ class Parameters(models.Model):
     #id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     pass
 """
+class Dimension(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def ids(cls, names, chunk_size=900):
+        """
+        Map each name to its id, creating the rows that do not exist yet
+        """
+        names = list(set(names))
+        known = {}
+        # Stay below the bound-parameter limit of SQLite
+        for i in range(0, len(names), chunk_size):
+            chunk = names[i:i + chunk_size]
+            known.update(cls.objects.filter(name__in=chunk).values_list('name', 'id'))
+            missing = [name for name in chunk if name not in known]
+            if missing:
+                cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+                known.update(cls.objects.filter(name__in=missing).values_list('name', 'id'))
+        return known
+
+
+class League(Dimension):
+    pass
+
+
+class Team(Dimension):
+    pass
+
+
+class Player(Dimension):
+    pass
+
+
 class Request(models.Model):
     target = models.CharField(max_length=50, null=True)
-    nameLeague = models.CharField(max_length=50)
+    league = models.ForeignKey(League, on_delete=models.PROTECT)
     year = models.PositiveIntegerField()
-    nameTeam = models.CharField(max_length=50)
-    namePlayer = models.CharField(max_length=50)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    team = models.ForeignKey(Team, on_delete=models.PROTECT)
+    player = models.ForeignKey(Player, on_delete=models.PROTECT)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    # Never NULL, the history pages on (created_at, id)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # History of a user, newest first, also covers the user foreign key
+            models.Index(fields=['user', 'created_at'], name='request_user_created_at'),
+        ]
 
 class Team_Status(models.Model):
-    nameTeam = models.CharField(max_length=50)
-    nameLeague = models.CharField(max_length=50)
+    team = models.ForeignKey(Team, on_delete=models.PROTECT, db_index=False)
+    league = models.ForeignKey(League, on_delete=models.PROTECT, db_index=False)
     year = models.PositiveIntegerField()
     avgAge = models.FloatField()
     valueTeam = models.BigIntegerField()
     numberPlayers = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['league', 'year'], name='team_status_league_year'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'year'], name='unique_team_status'),
+        ]
+
+
+class Player_StatusQuerySet(models.QuerySet):
+    def with_names(self):
+        """
+        Rows as dicts with the flat column names of players.csv
+        (namePlayer, nameTeam, nameLeague), as the predictors expect
+        """
+        return self.values(
+            'id', 'age', 'year', 'valuePlayer', 'role', 'games', 'goals', 'assists',
+            'minutes', 'goalsConceded', 'cleanSheets',
+            namePlayer=models.F('player__name'),
+            nameTeam=models.F('team__name'),
+            nameLeague=models.F('league__name'),
+        )
+
+
 class Player_Status(models.Model):
-    namePlayer = models.CharField(max_length=50)
-    nameTeam = models.CharField(max_length=50)
-    nameLeague = models.CharField(max_length=50)
+    player = models.ForeignKey(Player, on_delete=models.PROTECT, db_index=False)
+    team = models.ForeignKey(Team, on_delete=models.PROTECT, db_index=False)
+    league = models.ForeignKey(League, on_delete=models.PROTECT, db_index=False)
     age = models.IntegerField()
     year = models.PositiveIntegerField()
     valuePlayer = models.BigIntegerField()
@@ -129,3 +199,73 @@ class Player_Status(models.Model):
     minutes = models.PositiveIntegerField()
     goalsConceded = models.PositiveIntegerField()
     cleanSheets = models.PositiveIntegerField()
+
+    objects = Player_StatusQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Also serves (league, year) lookups through its prefix
+            models.Index(fields=['league', 'year', 'team'], name='player_status_league_year_team'),
+        ]
+        constraints = [
+            # Natural key of the ingest upserts, its prefix also indexes player
+            models.UniqueConstraint(fields=['player', 'team', 'year'], name='unique_player_status'),
+        ]
+
+class Player_Forecast(models.Model):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, db_index=False)
+    modelVersion = models.CharField(max_length=64)
+    # Dataset_Version of the history the forecast was made from
+    datasetVersion = models.PositiveIntegerField(default=0)
+    year = models.PositiveIntegerField()
+    age = models.FloatField(null=True)
+    valuePlayer = models.FloatField()
+    games = models.FloatField()
+    goals = models.FloatField()
+    assists = models.FloatField()
+    minutes = models.FloatField()
+    role = models.CharField(max_length=100)
+    team = models.ForeignKey(Team, on_delete=models.PROTECT, db_index=False)
+    league = models.ForeignKey(League, on_delete=models.PROTECT, db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Its prefix serves the lookups of stored_forecast
+            models.UniqueConstraint(fields=['player', 'modelVersion', 'datasetVersion', 'year'],
+                                    name='unique_player_forecast_version'),
+        ]
+
+
+class Dataset_Version(models.Model):
+    """Single row, bumped whenever parseData reloads the data"""
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Ingest_Checksum(models.Model):
+    """Checksum of a source file (empty partition) or of one of its league/season partitions"""
+    # "<players|squads>:<format>:<absolute path>"
+    source = models.CharField(max_length=255)
+    partition = models.CharField(max_length=100, blank=True)
+    checksum = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'partition'], name='unique_ingest_checksum'),
+        ]
+
+
+class Profiling_Session(models.Model):
+    """
+    Single row, edited in the admin: until `until`, a sample_rate fraction of
+    the requests is profiled, and kept when slower than slower_than seconds
+    """
+    sample_rate = models.FloatField(default=0.01)
+    slower_than = models.FloatField(null=True, blank=True)
+    until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Profiling until {self.until}" if self.until else "Profiling off"
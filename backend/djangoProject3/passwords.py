@@ -0,0 +1,71 @@
+from django.conf import settings
+import bcrypt
+import threading
+import time
+
+from .metrics import password_seconds
+from .pools import BoundedPool
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BoundedPool(settings.PASSWORD_HASH_POOL_SIZE, settings.PASSWORD_HASH_QUEUE_DEPTH, 'bcrypt')
+    return _pool
+
+
+def _hash(password):
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(settings.BCRYPT_ROUNDS))
+    password_seconds.observe(time.perf_counter() - start, 'hash')
+    return hashed.decode('utf-8')
+
+
+def _check(password, hashed):
+    start = time.perf_counter()
+    valid = bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    password_seconds.observe(time.perf_counter() - start, 'check')
+    return valid
+
+
+async def hash_password(password):
+    """
+    bcrypt hash of `password` at the configured cost, computed on the
+    password pool. Raises PoolBusy when too many hashes are waiting.
+    """
+    return await get_pool().run(_hash, password)
+
+
+async def check_password(password, hashed):
+    """
+    Whether `password` matches the stored bcrypt hash, computed on the
+    password pool. Raises PoolBusy when too many hashes are waiting.
+    """
+    return await get_pool().run(_check, password, hashed)
+
+
+def needs_rehash(hashed):
+    """
+    Whether a stored hash ("$2b$<cost>$...") was made at another cost than BCRYPT_ROUNDS
+    """
+    try:
+        return int(hashed.split('$')[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def stats():
+    """
+    Current cost and refused requests, to tune BCRYPT_ROUNDS against capacity
+    with the ccbda_password_seconds histogram
+    """
+    return {
+        'rounds': settings.BCRYPT_ROUNDS,
+        'rejected': _pool.rejected if _pool else 0,
+    }
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import threading
+
+from . import profiling
+
+
+class PoolBusy(Exception):
+    """
+    Every worker of a BoundedPool is busy and its queue is full
+    """
+
+
+class BoundedPool:
+    """
+    Threads running blocking or CPU heavy work for the async views, bounded
+    both in workers and in tasks waiting for one, so a burst is refused
+    instead of piling up.
+    """
+
+    def __init__(self, size, queue_depth, name):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(size + queue_depth)
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PoolBusy()
+        try:
+            # In the context of the submitter, so its request is timed and profiled
+            future = self._executor.submit(contextvars.copy_context().run, profiling.followed, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the task ends, even if the awaiting request went away
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
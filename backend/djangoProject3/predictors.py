@@ -1,14 +1,44 @@
 import pandas as pd
 import numpy as np
 import joblib
+import threading
+import time
+import gc
+import hashlib
+import logging
 import os
 
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model.joblib")
+
+# Number of seasons forecast after the last known one
+HORIZON = 9
+
+# Model inputs that stay constant over the forecast horizon
+STATIC_COLS = ["name_player", "role", "squad_name", "championship"]
+
+
+def to_df(obj):
+    """
+    Player_Status rows as a dataframe. `obj` is a dataframe or an iterable of
+    dicts with the players.csv columns, e.g. Player_Status.objects.with_names()
+    """
+    if isinstance(obj, pd.DataFrame):
+        return obj
+    return pd.DataFrame(list(obj))
+
 
 def obj_to_df(obj):
     """
     Convert a pandas object to a dataframe
     """
-    return rename(fill_years(pd.DataFrame(obj.values()).sort_values(by=['year'])))
+    with metrics.span('obj_to_df'):
+        return rename(fill_years(to_df(obj).sort_values(by=['year'])))
 
 
 def fill_years(df):
@@ -53,7 +83,7 @@ class PlayerPredictor:
 
         return result
 
-    def __init__(self):
+    def __init__(self, clf=None):
         self.target_cols = [
             "games_played",
             "goals",
@@ -61,14 +91,20 @@ class PlayerPredictor:
             "minute_played",
             "value_player",
         ]
+        self.output_cols = self.target_cols + [
+            "year",
+            "age",
+            "role",
+            "squad_name",
+            "championship",
+        ]
         self.need_drop = [f"lag_3_{var}" for var in self.target_cols]
         self.base = {var: f"lag_1_{var}" for var in self.target_cols}
+        self.lag_cols = [
+            f"lag_{level}_{var}" for level in [1, 2, 3] for var in self.target_cols
+        ]
 
-        model_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), "model.joblib"
-        )
-
-        self.clf = joblib.load(model_path)
+        self.clf = joblib.load(MODEL_PATH) if clf is None else clf
 
         for level in [1, 2]:
             extra = {
@@ -84,11 +120,14 @@ class PlayerPredictor:
         result["year"] += 1
         return result
 
-    def pred_player_lag(self, df):
-
-        if not isinstance(df, pd.DataFrame):
-            df = pd.DataFrame(df.values())
+    def lag_features(self, df):
+        """
+        Model-ready history: renamed columns plus lag_1/lag_2 per player
+        """
+        with metrics.span('lag_features'):
+            return self._lag_features(to_df(df))
 
+    def _lag_features(self, df):
         df = df.rename(
             columns=dict(
                 namePlayer="name_player",
@@ -100,7 +139,7 @@ class PlayerPredictor:
             )
         ).drop(columns=["goalsConceded", "cleanSheets"])
 
-        in_lag = (
+        return (
             PlayerPredictor.add_lag_columns(
                 df.set_index(["name_player", "year"]).sort_index(),
                 columns=self.target_cols,
@@ -110,17 +149,155 @@ class PlayerPredictor:
             .replace(-1, np.nan)
         )
 
-        final = pd.DataFrame()
+    def pred_player_lag(self, df):
+        in_lag = self.lag_features(df)
 
-        pred = in_lag.iloc[-1:].reset_index()
+        return self.rollout(in_lag.iloc[-1:])[self.output_cols]
 
-        for i in range(1, 10):
-            crafted = self.step_row(pred)
-            result = pd.DataFrame(self.clf.predict(crafted), columns=self.target_cols)
-            pred = pd.concat([crafted, result], axis=1)
+    def pred_batch(self, df):
+        """
+        Forecast every player in `df` at once.
 
-            final = pd.concat([final, pred], axis=0)
+        Lags are built in one grouped pass and each forecast year is a single
+        predict call over all players, instead of nine calls per player.
+        """
+        df = to_df(df)
+        if df.empty:
+            return pd.DataFrame(columns=["name_player"] + self.output_cols)
 
-        return final[
-            self.target_cols + ["year", "age", "role", "squad_name", "championship"]
-        ]
+        in_lag = self.lag_features(df)
+        last = in_lag.groupby("name_player", sort=False).tail(1)
+
+        return self.rollout(last)[["name_player"] + self.output_cols]
+
+    def rollout(self, last, steps=HORIZON):
+        """
+        Forecast `steps` years ahead for every row of `last` (one row per
+        player, with the lag_1/lag_2 columns of add_lag_columns).
+
+        The lags are kept in a preallocated array that is shifted in place
+        every year; only the model input and the final output are DataFrames.
+        Rows are returned player by player, one row per forecast year.
+        """
+        n, k = len(last), len(self.target_cols)
+
+        # lags[:, :k] is lag_1, lags[:, k:2k] lag_2 and lags[:, 2k:] lag_3
+        lags = np.empty((n, 3 * k))
+        lags[:, :k] = last[self.target_cols].to_numpy(dtype=float)
+        lags[:, k:] = last[self.lag_cols[: 2 * k]].to_numpy(dtype=float)
+
+        year = last["year"].to_numpy()
+        age = last["age"].to_numpy()
+        static = {col: last[col].to_numpy() for col in STATIC_COLS}
+
+        out = None
+        for step in range(steps):
+            if step:
+                lags[:, k:] = lags[:, : 2 * k]
+                lags[:, :k] = out[:, step - 1]
+
+            features = dict(static, year=year + step + 1, age=age + step + 1)
+            features.update(zip(self.lag_cols, lags.T))
+            with metrics.span('predict'):
+                result = self.clf.predict(pd.DataFrame(features))
+
+            if out is None:
+                out = np.empty((n, steps, k), dtype=result.dtype)
+            out[:, step] = result
+
+        ahead = np.arange(1, steps + 1)
+        final = pd.DataFrame(
+            out.reshape(n * steps, k),
+            columns=self.target_cols,
+            index=np.repeat(np.arange(n), steps),
+        )
+        final["year"] = (year[:, None] + ahead).ravel()
+        final["age"] = (age[:, None] + ahead).ravel()
+        for col in STATIC_COLS:
+            final[col] = np.repeat(static[col], steps)
+        return final
+
+
+def _resident_bytes():
+    """
+    Resident set size of the current process, in bytes
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS), good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+_model_version = None
+
+
+def model_version():
+    """
+    Short content hash of model.joblib, used to tell stored forecasts of
+    different models apart
+    """
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.sha256()
+        with open(MODEL_PATH, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _model_version = digest.hexdigest()[:12]
+    return _model_version
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+_predictor_stats = {}
+
+
+def get_predictor():
+    """
+    Return the process-wide PlayerPredictor, loading model.joblib on first use
+    """
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                rss_before = _resident_bytes()
+                start = time.perf_counter()
+                predictor = PlayerPredictor()
+                _predictor_stats.update(
+                    pid=os.getpid(),
+                    load_seconds=time.perf_counter() - start,
+                    resident_bytes=max(_resident_bytes() - rss_before, 0),
+                    model_path=MODEL_PATH,
+                    model_version=model_version(),
+                )
+                logger.info(
+                    "Loaded %s in %.3fs (+%.1f MiB resident, pid %d)",
+                    MODEL_PATH,
+                    _predictor_stats["load_seconds"],
+                    _predictor_stats["resident_bytes"] / 2 ** 20,
+                    _predictor_stats["pid"],
+                )
+                _predictor = predictor
+    return _predictor
+
+
+def preload_predictor():
+    """
+    Load the shared predictor before the server forks its workers.
+
+    The loaded objects are moved to the permanent GC generation so the
+    collector in the children does not touch (and copy) their pages.
+    """
+    predictor = get_predictor()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+    return predictor
+
+
+def predictor_stats():
+    """
+    Load time and resident size of the shared predictor, empty if not loaded yet
+    """
+    return dict(_predictor_stats, loaded=_predictor is not None, current_pid=os.getpid())
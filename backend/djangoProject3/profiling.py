@@ -0,0 +1,295 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from django.conf import settings
+from django.utils import timezone
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from .models import Profiling_Session
+
+
+logger = logging.getLogger(__name__)
+
+# Parameters never written to a profile
+SECRET_PARAMS = ('password', 'csrfmiddlewaretoken')
+
+
+def fold(frame, below=None):
+    """
+    Stack of `frame` as "module.function;...", outermost call first, the
+    line format of flame graph tools. Only the calls made by the frame
+    running the `below` code are kept, when given.
+    """
+    calls = []
+    while frame is not None and frame.f_code is not below:
+        code = frame.f_code
+        calls.append(f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(calls))
+
+
+class Sampler:
+    """
+    Samples the stack of the threads working for profiled requests every
+    `interval` seconds, from a thread of its own. The thread only runs while
+    at least one request is profiled. Registrations are keyed by an object
+    of the caller, as the async requests answered together all run on the
+    event loop thread; its samples count for each of them.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._registrations = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, key, thread_id, stacks, below=None, label=None):
+        """
+        Count the stacks of the thread into the `stacks` Counter, cut and
+        prefixed with `label` as fold(frame, below) does, until stop(key)
+        """
+        with self._lock:
+            self._registrations[key] = (thread_id, stacks, below, label)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, key):
+        """
+        Stop sampling for `key`, returning a copy of its Counter
+        """
+        with self._lock:
+            _, stacks, _, _ = self._registrations.pop(key, (None, Counter(), None, None))
+            return Counter(stacks)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._registrations:
+                    self._thread = None
+                    return
+                for thread_id, stacks, below, label in self._registrations.values():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = fold(frame, below)
+                        stacks[f"{label};{stack}" if label else stack] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = Sampler(settings.PROFILING_INTERVAL)
+    return _sampler
+
+
+_current = ContextVar('profile', default=None)
+
+
+def followed(fn, *args):
+    """
+    fn(*args), sampled as part of the profiled request that submitted it to
+    a BoundedPool thread, if any
+    """
+    profile = _current.get()
+    if profile is None:
+        return fn(*args)
+    key = object()
+    try:
+        # Pool threads are named <pool>_<n>
+        get_sampler().start(key, threading.get_ident(), profile.stacks, followed.__code__,
+                            f"[{threading.current_thread().name.rsplit('_', 1)[0]} pool]")
+    except Exception:
+        logger.exception("Could not follow a task of a profiled request")
+    try:
+        return fn(*args)
+    finally:
+        try:
+            get_sampler().stop(key)
+        except Exception:
+            logger.exception("Could not follow a task of a profiled request")
+
+
+_session = None
+_session_checked = None
+
+
+def stale():
+    """
+    Whether the Profiling_Session row is due to be read again, at most every
+    PROFILING_CHECK_INTERVAL seconds
+    """
+    return _session_checked is None or time.monotonic() - _session_checked >= settings.PROFILING_CHECK_INTERVAL
+
+
+def refresh():
+    global _session, _session_checked
+    _session = Profiling_Session.objects.filter(pk=1).first()
+    _session_checked = time.monotonic()
+
+
+def sampled():
+    """
+    Whether to profile the next request. Outside of a profiling session this
+    is a clock read, plus the refresh() due every PROFILING_CHECK_INTERVAL.
+    """
+    session = _session
+    if session is None or session.until is None or session.until <= timezone.now():
+        return False
+    return random.random() < session.sample_rate
+
+
+def request_params(request):
+    params = {key: values if len(values) > 1 else values[0] for key, values in request.GET.lists()}
+    if request.method == 'POST' and request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        params.update({key: values if len(values) > 1 else values[0] for key, values in request.POST.lists()
+                       if not any(secret in key for secret in SECRET_PARAMS)})
+    return params
+
+
+class Profile:
+    """
+    A request being profiled on the current thread. The errors of the
+    profiler are logged, never raised to the request.
+    """
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.stacks = Counter()
+        self._token = _current.set(self)
+        try:
+            get_sampler().start(self, threading.get_ident(), self.stacks)
+        except Exception:
+            logger.exception("Could not start profiling a request")
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.start
+        _current.reset(self._token)
+        try:
+            # A pool task of the request may still be running and counting
+            self.stacks = get_sampler().stop(self)
+        except Exception:
+            logger.exception("Could not stop profiling a request")
+            self.stacks = Counter(self.stacks)
+
+    def save(self, request, response):
+        slower_than = _session.slower_than if _session else None
+        if slower_than is not None and self.seconds < slower_than:
+            return
+        try:
+            write(request, response, self)
+        except Exception:
+            logger.exception("Could not write the profile of %s", request.path)
+
+
+_written = 0
+
+
+def write(request, response, profile):
+    """
+    Write the samples of a request, with its view and parameters, to
+    PROFILING_DIR, keeping the PROFILING_KEEP latest profiles
+    """
+    global _written
+    match = getattr(request, 'resolver_match', None)
+    view = match.url_name if match and match.url_name else 'unmatched'
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    name = f"{datetime.now():%Y%m%dT%H%M%S}-{view}-{profile.seconds * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.json"
+    with open(os.path.join(settings.PROFILING_DIR, name), 'w') as f:
+        json.dump({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'params': request_params(request),
+            'status': response.status_code,
+            'seconds': profile.seconds,
+            'interval': settings.PROFILING_INTERVAL,
+            'pid': os.getpid(),
+            'thread': profile.thread,
+            'stacks': dict(profile.stacks),
+        }, f, default=str)
+
+    _written += 1
+    if _written % 50 == 0:
+        names = sorted(name for name in os.listdir(settings.PROFILING_DIR) if name.endswith('.json'))
+        for old in names[:-settings.PROFILING_KEEP]:
+            try:
+                os.remove(os.path.join(settings.PROFILING_DIR, old))
+            except OSError:
+                pass
+
+
+def load(directory, view=None):
+    """
+    The profiles written to `directory`, of one view or of all
+    """
+    profiles = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name), 'r') as f:
+            profile = json.load(f)
+        if view is None or profile['view'] == view:
+            profiles.append(profile)
+    return profiles
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the sampled requests of the current Profiling_Session with
+    Sampler: the thread answering the request and the pool threads running
+    its tasks. Under asgi.py the thread answering an async view is the event
+    loop, which the requests answered concurrently share.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if stale():
+            refresh()
+        if not sampled():
+            return self.get_response(request)
+        profile = Profile('request')
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        profile.save(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if stale():
+            await sync_to_async(refresh)()
+        if not sampled():
+            return await self.get_response(request)
+        profile = Profile('event loop')
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+        profile.save(request, response)
+        return response
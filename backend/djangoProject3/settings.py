@@ -46,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the time and queries of the other middleware are counted
+    'djangoProject3.metrics.MetricsMiddleware',
+    'djangoProject3.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -100,6 +103,15 @@ DATABASES = {
 }
 
 
+# bcrypt cost of new password hashes; hashes made at another cost are
+# redone at the user's next login. Hashing runs on a pool of
+# PASSWORD_HASH_POOL_SIZE threads with at most PASSWORD_HASH_QUEUE_DEPTH more
+# waiting, logins beyond that answer 503.
+BCRYPT_ROUNDS = int(os.environ.get('DJANGO_BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_POOL_SIZE = int(os.environ.get('DJANGO_PASSWORD_HASH_POOL_SIZE', 2))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.environ.get('DJANGO_PASSWORD_HASH_QUEUE_DEPTH', 32))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -142,3 +154,94 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Prediction model
+# Load model.joblib when the WSGI/ASGI module is imported, so a pre-forking
+# server (e.g. gunicorn --preload) shares it copy-on-write across workers.
+# Ignored when INFERENCE_SERVER_URL is set: the model then stays out of the
+# web workers unless the server fails and they fall back to it.
+
+PRELOAD_PREDICTOR = os.environ.get('DJANGO_PRELOAD_PREDICTOR', 'False') == 'True'
+
+# The async views predict on a pool of INFERENCE_POOL_SIZE threads, with at
+# most INFERENCE_QUEUE_DEPTH more predictions waiting; beyond that they answer
+# 503. Serve asgi.py (e.g. uvicorn djangoProject3.asgi:application) so a
+# request waiting for its prediction does not hold a worker.
+INFERENCE_POOL_SIZE = int(os.environ.get('DJANGO_INFERENCE_POOL_SIZE', 2))
+INFERENCE_QUEUE_DEPTH = int(os.environ.get('DJANGO_INFERENCE_QUEUE_DEPTH', 16))
+
+# Optional inference server (manage.py inferenceServer) loading the model
+# once for every web worker. Predictions fall back to the web process when it
+# does not answer within INFERENCE_SERVER_TIMEOUT seconds, and it is only
+# tried again INFERENCE_SERVER_RETRY seconds later. The calls wait on a pool of
+# INFERENCE_SERVER_POOL_SIZE threads apart from the inference pool, with at
+# most INFERENCE_SERVER_QUEUE_DEPTH more waiting; beyond that they predict in
+# process as well.
+INFERENCE_SERVER_URL = os.environ.get('DJANGO_INFERENCE_SERVER_URL') or None
+INFERENCE_SERVER_TIMEOUT = float(os.environ.get('DJANGO_INFERENCE_SERVER_TIMEOUT', 2))
+INFERENCE_SERVER_RETRY = 10
+INFERENCE_SERVER_POOL_SIZE = int(os.environ.get('DJANGO_INFERENCE_SERVER_POOL_SIZE', 8))
+INFERENCE_SERVER_QUEUE_DEPTH = int(os.environ.get('DJANGO_INFERENCE_SERVER_QUEUE_DEPTH', 32))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'forecasts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_FORECAST_CACHE_DIR', '/tmp/ccbda-forecasts'),
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_SESSION_CACHE_DIR', '/tmp/ccbda-sessions'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Sessions, with the email and user id of the logged in user, are read from
+# the cache and written through to the database, so a page costs no session
+# query once cached. The cache is shared by the processes of a host; use a
+# memcached or redis cache when the site runs on several hosts.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Forecast and history results, per player and data/model version.
+# Entries per process, then the optional cache alias shared by all workers.
+FORECAST_CACHE_SIZE = int(os.environ.get('DJANGO_FORECAST_CACHE_SIZE', 512))
+FORECAST_CACHE_ALIAS = os.environ.get('DJANGO_FORECAST_CACHE_ALIAS') or None
+FORECAST_CACHE_TIMEOUT = 24 * 60 * 60
+# Seconds a process trusts its copy of the dataset version
+FORECAST_CACHE_VERSION_TTL = 1
+
+# Requests per page of the history, and per query of its CSV/NDJSON export
+HISTORY_PAGE_SIZE = 50
+HISTORY_EXPORT_CHUNK_SIZE = 1000
+
+# The Request rows of the forecasts served are written in the background,
+# AUDIT_FLUSH_SIZE rows at a time or every AUDIT_FLUSH_INTERVAL seconds.
+# Beyond AUDIT_QUEUE_SIZE rows waiting new ones are dropped.
+AUDIT_FLUSH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 1.0
+AUDIT_QUEUE_SIZE = 10000
+
+# /metrics answers staff users of the admin, and scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" when it is set
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN') or None
+
+# Requests are profiled while the Profiling_Session row, edited in the admin
+# or by manage.py profileRequests, says so. Every process reads it at most
+# every PROFILING_CHECK_INTERVAL seconds, samples the stack of a profiled
+# request every PROFILING_INTERVAL seconds and keeps about the
+# PROFILING_KEEP latest profiles in PROFILING_DIR.
+PROFILING_DIR = os.environ.get('DJANGO_PROFILING_DIR', '/tmp/ccbda-profiles')
+PROFILING_INTERVAL = 0.005
+PROFILING_CHECK_INTERVAL = 10
+PROFILING_KEEP = 1000
+
+# Responses of the league/year/team/player catalog kept per process
+CATALOG_CACHE_SIZE = int(os.environ.get('DJANGO_CATALOG_CACHE_SIZE', 2048))
@@ -28,8 +28,13 @@ urlpatterns = [
     path('logout', views.logout, name='logout'),
     path('register', views.register, name='register'),
     path('request', views.request, name="request"),
+    path('forecast', views.forecast, name="forecast"),
+    path('catalog', views.catalog, name="catalog"),
+    path('player_history', views.player_history, name="player_history"),
     path('user_profile', views.user_profile, name="user_profile"),
-    path('history', views.history, name="history")
+    path('history', views.history, name="history"),
+    path('history/export', views.history_export, name="history_export"),
+    path('metrics', views.prometheus_metrics, name="metrics")
 ]
 
 handler404 = "djangoProject3.views.page_not_found_view"
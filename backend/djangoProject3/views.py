@@ -1,4 +1,10 @@
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from datetime import datetime
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 # from .models import Leads
 from collections import Counter
@@ -6,109 +12,428 @@ from django.core.exceptions import ValidationError
 from validate_email import validate_email
 from django.contrib.auth.models import User
 
-from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+import csv
+import hmac
+import io
+import json
 
-from .predictors import PlayerPredictor, obj_to_df, fill_years
+from . import audit, forecast_cache, inference, metrics, passwords
+from .catalog import catalog_entry
+from .pools import PoolBusy
+from .predictors import get_predictor, model_version, obj_to_df, predictor_stats, HORIZON
 
 from .models import *
 
+def stored_forecast(player):
+    """
+    Precomputed forecast of a player in the shape of pred_player_lag(...).to_dict("list"),
+    or None when precomputeForecasts has not covered this player, model and data version
+    """
+    rows = list(Player_Forecast.objects.filter(player__name=player, modelVersion=model_version(),
+                                               datasetVersion=forecast_cache.dataset_version()).order_by('year').values_list(
+        'games', 'goals', 'assists', 'minutes', 'valuePlayer', 'year', 'age', 'role', 'team__name', 'league__name'))
+    if len(rows) != HORIZON:
+        return None
+
+    keys = ["games_played", "goals", "assists", "minute_played", "value_player",
+            "year", "age", "role", "squad_name", "championship"]
+    return {key: [row[i] for row in rows] for i, key in enumerate(keys)}
+
+
+# (JSON key, Player_Status field), named like the keys of obj_to_df
+HISTORY_COLUMNS = [
+    ("year", "year"),
+    ("age", "age"),
+    ("games_played", "games"),
+    ("goals", "goals"),
+    ("assists", "assists"),
+    ("minute_played", "minutes"),
+    ("value_player", "valuePlayer"),
+    ("role", "role"),
+    ("squad_name", "team__name"),
+    ("championship", "league__name"),
+]
+
+
+def history_columns(player):
+    """
+    Yearly history of a player as one list per field. Seasons without a row
+    are simply absent from "year" instead of being filled with -1.
+    """
+    def build():
+        rows = Player_Status.objects.filter(player__name=player).order_by('year').values_list(
+            *(field for _, field in HISTORY_COLUMNS))
+        columns = list(zip(*rows)) or [()] * len(HISTORY_COLUMNS)
+        return dict({'player': player}, **{key: list(values) for (key, _), values in zip(HISTORY_COLUMNS, columns)})
+
+    return forecast_cache.cached('history-columns', player, build)
+
+
 def page_not_found_view(request, exception):
     return render(request, 'pages-error-404.html', status=404)
 
 
-@csrf_exempt
-def request(request):
+# Columns of the history plotted next to the forecast
+HISTORY_DATA_COLUMNS = ["games_played", "goals", "assists", "minute_played", "value_player", "age", "year"]
+
+
+async def player_rows(player):
+    return [row async for row in Player_Status.objects.filter(player__name=player).with_names()]
+
+
+def history_data(rows):
+    return obj_to_df(rows)[HISTORY_DATA_COLUMNS].to_dict("list")
+
+
+def predict_player(rows):
+    return get_predictor().pred_player_lag(rows).to_dict("list")
+
+
+async def session_email(request):
+    """
+    Email of the logged in user, None if nobody is. Loading the session
+    queries the database, which async views may only do through sync_to_async.
+    """
+    return await sync_to_async(request.session.get)('email')
+
+
+async def request(request):
     if request.method == 'GET':
-        if "email" in request.session:
+        if await session_email(request):
             return render(request, 'request.html', {'request_nav': True})
         else:
             return redirect('/login')
     else:
         if request.POST.get("create_model"):
-            items = []
+            user_id = await session_user_id(request)
+            if user_id is None:
+                return redirect('/login')
             target = request.POST.get('target')
             championship = request.POST.get('championship')
             year = request.POST.get('year')
             squad = request.POST.get('squad')
             player = request.POST.get('player')
-            objects = Player_Status.objects.filter(namePlayer=player)
-
-            data = obj_to_df(objects)[[
-                      "games_played",
-                      "goals",
-                      "assists",
-                      "minute_played",
-                      "value_player",
-                      "age",
-                      "year"
-                  ]].to_dict("list")
-            prediction = PlayerPredictor().pred_player_lag(objects).to_dict("list")
-
-            user = User.objects.get(email=request.session['email'])
-            field_object = User._meta.get_field('id')
-            user_id = field_object.value_from_object(user)
-
-            request_player = Request(target=target, nameLeague=championship, year=year, nameTeam=squad, namePlayer=player, user_id=user_id)
-            request_player.save()
-
-            return render(request, 'request.html',
-                          {'request_nav': True,
-                              'data': data,
-                              'pred': prediction,
-                              'plot': ["value_player", "goals", "assists", "games_played", "minute_played"],
-                              'name': player})
+
+            # The ORM reads run on the event loop, pandas and predict on the inference pool
+            # and the calls to the inference server on a pool of their own
+
+            # Read once when both the history and the forecast miss the cache
+            fetched = []
+
+            async def rows():
+                if not fetched:
+                    with metrics.span('orm_fetch'):
+                        fetched.append(await player_rows(player))
+                return fetched[0]
+
+            async def history():
+                return await inference.run(history_data, await rows())
+
+            async def forecast():
+                with metrics.span('stored_forecast'):
+                    stored = await sync_to_async(stored_forecast)(player)
+                if stored:
+                    return stored
+                remote = await inference.remote_forecast(await rows())
+                if remote is not None:
+                    return remote
+                return await inference.run(predict_player, await rows())
+
+            try:
+                data = await forecast_cache.acached('history', player, history)
+                prediction = await forecast_cache.acached('forecast', player, forecast)
+            except PoolBusy:
+                return HttpResponse("Too many forecasts in progress, please try again", status=503)
+
+            audit.record(target, championship, year, squad, player, user_id)
+
+            with metrics.span('render'):
+                return render(request, 'request.html',
+                              {'request_nav': True,
+                                  'data': data,
+                                  'pred': prediction,
+                                  'plot': ["value_player", "goals", "assists", "games_played", "minute_played"],
+                                  'name': player})
         else:
             items = []
+            try:
+                year = parse_year(request.POST.get('value_year'))
+            except ValueError:
+                return HttpResponse("value_year must be a number", status=400)
             # PARAMETERS OF THE SELECTION
             if not request.POST.get('value_squad'):
                 championship = request.POST.get('value_championship')
-                year = request.POST.get('value_year')
-                objects = Team_Status.objects.filter(nameLeague=championship, year=year).values_list('nameTeam', flat=True)
-                objects = sorted(objects)
+                objects, _, _ = await sync_to_async(catalog_entry)(championship, year)
                 for object in objects:
                     items.append(object+"/")
 
             elif not request.POST.get('value_player'):
                 championship = request.POST.get('value_championship')
-                year = request.POST.get('value_year')
                 squad = request.POST.get('value_squad')
-                objects = Player_Status.objects.filter(nameLeague=championship, year=year, nameTeam=squad).values_list('namePlayer', flat=True)
-
-                objects = sorted(objects)
+                objects, _, _ = await sync_to_async(catalog_entry)(championship, year, squad)
                 for object in objects:
                     items.append(object + "/")
             else:
-                championship = request.POST.get('value_championship')
-                year = request.POST.get('value_year')
-                squad = request.POST.get('value_squad')
                 player = request.POST.get('value_player')
-                objects = Player_Status.objects.filter(namePlayer=player).values_list('year', 'valuePlayer', flat=True)
-
-                objects = sorted(objects)
-                for object in objects:
-                    items.append(object + "/")
+                return JsonResponse(await sync_to_async(history_columns)(player))
 
             return HttpResponse(items)
 
 
-def history(request):
+# csrf_exempt() of Django 4.2 would hide that the view is a coroutine
+request.csrf_exempt = True
+
+
+def parse_year(value):
+    """
+    A year parameter as a number, None when absent. Raises ValueError when
+    it is not a number.
+    """
+    return int(value) if value else None
+
+
+def catalog_params(request):
+    return request.GET.get('league'), parse_year(request.GET.get('year')), request.GET.get('team')
+
+
+def catalog_etag(request):
+    try:
+        return catalog_entry(*catalog_params(request))[2]
+    except ValueError:
+        return None
+
+
+def catalog_last_modified(request):
+    try:
+        catalog_params(request)
+    except ValueError:
+        # Never 304, the view answers 400
+        return None
+    return forecast_cache.dataset_updated_at()
+
+
+@require_GET
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+def catalog(request):
+    """
+    JSON list of the next cascade level: leagues, then the years of a league,
+    the teams of a league/year and the players of a league/year/team
+    """
+    try:
+        params = catalog_params(request)
+    except ValueError:
+        return JsonResponse({'error': "year must be a number"}, status=400)
+    _, body, _ = catalog_entry(*params)
+    response = HttpResponse(body, content_type='application/json')
+    # Cache, but revalidate against the ETag every time
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def predict_players(rows):
+    """
+    pred_batch of the rows, as {player: forecast} ready for JSON
+    """
+    prediction = get_predictor().pred_batch(rows)
+    # NaN is not valid JSON
+    prediction = prediction.astype(object).where(prediction.notna(), None)
+    return {
+        name: group.drop(columns='name_player').to_dict("list")
+        for name, group in prediction.groupby('name_player', sort=True)
+    }
+
+
+async def forecast(request):
+    """
+    Forecast a whole squad (championship, year, squad) or a whole
+    championship season (championship, year) in one batch
+    """
+    if not await session_email(request):
+        return redirect('/login')
+
+    championship = request.GET.get('championship')
+    year = request.GET.get('year')
+    squad = request.GET.get('squad')
+    if not championship or not year:
+        return JsonResponse({'error': "championship and year are required"}, status=400)
+    try:
+        year = parse_year(year)
+    except ValueError:
+        return JsonResponse({'error': "year must be a number"}, status=400)
+
+    selection = Player_Status.objects.filter(league__name=championship, year=year)
+    if squad:
+        selection = selection.filter(team__name=squad)
+
+    with metrics.span('orm_fetch'):
+        rows = [row async for row in
+                Player_Status.objects.filter(player__in=selection.values('player')).with_names()]
+    try:
+        players = await inference.run(predict_players, rows)
+    except PoolBusy:
+        return HttpResponse("Too many forecasts in progress, please try again", status=503)
+    return JsonResponse({'championship': championship, 'year': year, 'squad': squad, 'players': players})
+
+
+@require_GET
+def player_history(request):
+    player = request.GET.get('player')
+    if not player:
+        return JsonResponse({'error': "player is required"}, status=400)
+    return JsonResponse(history_columns(player))
+
+
+# Columns of a request in the history page and its exports
+HISTORY_FIELDS = ['target', 'league__name', 'year', 'team__name', 'player__name', 'created_at']
+EXPORT_HEADER = ['target', 'league', 'year', 'team', 'player', 'created_at']
+
+
+def history_page(user_id, before=None, size=None):
+    """
+    Requests of a user, newest first, older than the `before` cursor. Keyset
+    pagination on (created_at, id) walks the (user, created_at) index, so
+    every page costs the same however long the history is.
+    """
+    requests = Request.objects.filter(user_id=user_id)
+    if before:
+        created_at, request_id = before
+        requests = requests.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=request_id))
+    return list(requests.order_by('-created_at', '-id').values_list(*HISTORY_FIELDS, 'id')[:size or settings.HISTORY_PAGE_SIZE])
+
+
+def page_cursor(row):
+    return f"{row[-2].isoformat()}_{row[-1]}"
+
+
+def parse_cursor(value):
+    try:
+        created_at, request_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(request_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+async def session_user_id(request):
+    """
+    Id of the logged in user, None if nobody is. Kept in the session next to
+    the email so it is only looked up once per session.
+    """
+    def get():
+        if 'email' not in request.session:
+            return None
+        if 'user_id' not in request.session:
+            request.session['user_id'] = User.objects.values_list('id', flat=True).get(email=request.session['email'])
+        return request.session['user_id']
+
+    return await sync_to_async(get)()
+
+
+async def history(request):
     if request.method == "GET":
-        if "email" in request.session:
-            requests = []
-            user = User.objects.get(email=request.session['email'])
-            field_object = User._meta.get_field('id')
-            user_id = field_object.value_from_object(user)
+        user_id = await session_user_id(request)
+        if user_id:
             try:
-                requests_objects = Request.objects.filter(user_id=user_id).values_list('target', 'nameLeague', 'year', 'nameTeam', 'namePlayer', 'created_at')
-                for req in requests_objects:
-                    requests.append(req)
+                requests = await sync_to_async(history_page)(user_id, parse_cursor(request.GET.get('before')))
+                next_cursor = page_cursor(requests[-1]) if len(requests) == settings.HISTORY_PAGE_SIZE else None
 
-                return render(request, 'history.html', {'history_nav': True, 'requests': requests})
+                with metrics.span('render'):
+                    return render(request, 'history.html', {'history_nav': True, 'requests': [req[:-1] for req in requests],
+                                                            'older': next_cursor, 'paged': 'before' in request.GET})
             except:
                 return render(request, 'history.html', {'history_nav': True})
         else:
             return redirect('/login')
 
+
+def export_lines(rows, format):
+    if format == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_HEADER, row[:-1])), cls=DjangoJSONEncoder) + "\n"
+    else:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row[:-1])
+        yield buffer.getvalue()
+
+
+async def history_export(request):
+    """
+    The whole history of the user as CSV (default) or NDJSON (?format=ndjson),
+    streamed one keyset page at a time
+    """
+    user_id = await session_user_id(request)
+    if not user_id:
+        return redirect('/login')
+    format = 'ndjson' if request.GET.get('format') == 'ndjson' else 'csv'
+    size = settings.HISTORY_EXPORT_CHUNK_SIZE
+    header = "" if format == 'ndjson' else ",".join(EXPORT_HEADER) + "\r\n"
+
+    # Served by asgi.py the response consumes an async iterator, by wsgi.py a sync one
+    if isinstance(request, ASGIRequest):
+        async def content():
+            yield header
+            before = None
+            while True:
+                rows = await sync_to_async(history_page)(user_id, before, size)
+                for chunk in export_lines(rows, format):
+                    yield chunk
+                if len(rows) < size:
+                    return
+                before = parse_cursor(page_cursor(rows[-1]))
+    else:
+        def content():
+            yield header
+            before = None
+            while True:
+                rows = history_page(user_id, before, size)
+                yield from export_lines(rows, format)
+                if len(rows) < size:
+                    return
+                before = parse_cursor(page_cursor(rows[-1]))
+
+    response = StreamingHttpResponse(content(), content_type='application/x-ndjson' if format == 'ndjson' else 'text/csv')
+    response['Content-Disposition'] = f'attachment; filename="history.{format}"'
+    return response
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Request, stage, database and password histograms in the Prometheus text format,
+    for staff users of the admin or a scraper sending the METRICS_TOKEN bearer token
+    """
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    if not (authorized or (request.user.is_active and request.user.is_staff)):
+        return HttpResponse("Forbidden", status=403)
+
+    cache = forecast_cache.stats()
+    password = passwords.stats()
+    values = [
+        ('ccbda_forecast_cache_local_hits_total', 'counter', "Forecasts served from the process cache",
+         cache['local_hits']),
+        ('ccbda_forecast_cache_local_misses_total', 'counter', "Forecasts missing from the process cache",
+         cache['local_misses']),
+        ('ccbda_forecast_cache_shared_hits_total', 'counter', "Forecasts served from the shared cache",
+         cache['shared_hits']),
+        ('ccbda_password_rejected_total', 'counter', "Logins and registrations refused by a full password pool",
+         password['rejected']),
+        ('ccbda_password_rounds', 'gauge', "bcrypt cost of the new password hashes", password['rounds']),
+    ]
+    predictor = predictor_stats()
+    values.append(('ccbda_predictor_loaded', 'gauge', "Whether this process holds the model", int(predictor['loaded'])))
+    if predictor['loaded']:
+        # Measured in the process that loaded it, the server before forking when preloaded
+        values += [
+            ('ccbda_predictor_load_seconds', 'gauge', "Time taken to load the model", predictor['load_seconds']),
+            ('ccbda_predictor_resident_bytes', 'gauge', "Resident memory added by loading the model",
+             predictor['resident_bytes']),
+        ]
+    return HttpResponse(metrics.render(values), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def user_profile(request):
     if "email" in request.session:
         if request.method == 'POST':
@@ -142,9 +467,9 @@ def home(request):
         return redirect('/login')
 
 
-def login(request):
+async def login(request):
     if request.method == 'GET':
-        if "email" in request.session:
+        if await session_email(request):
             return redirect('/')
         else:
             return render(request, 'login.html')
@@ -159,23 +484,38 @@ def login(request):
 
         if not errors:
             try:
-                user = User.objects.get(email=email)
+                user = await User.objects.aget(email=email)
                 field_object = User._meta.get_field('password')
                 password_server = field_object.value_from_object(user)
-                password_hashed = password.encode('utf-8')
             except:
                 errors.append("Email/password not correct")
                 return render(request, 'login.html', {'errors': errors})
 
             if not errors:
-                if bcrypt.checkpw(password_hashed, password_server.encode('utf-8')):
-                    request.session["email"] = str(email)
+                try:
+                    valid = await passwords.check_password(password, password_server)
+                except PoolBusy:
+                    errors.append("Too many logins in progress, please try again")
+                    return render(request, 'login.html', {'errors': errors}, status=503)
+
+                if valid:
+                    if passwords.needs_rehash(password_server):
+                        # Upgrade the hash to the configured cost while the password is known
+                        try:
+                            user.password = await passwords.hash_password(password)
+                            await user.asave(update_fields=['password', 'updated_at'])
+                        except PoolBusy:
+                            pass
+                    def log_in():
+                        request.session["email"] = str(email)
+                        request.session["user_id"] = user.id
+                    await sync_to_async(log_in)()
                     return redirect('/')
                 else:
                     errors.append("Email or Password wrong!")
                     return render(request, 'login.html', {'errors': errors})
 
-def register(request):
+async def register(request):
     errors = []
     if request.method == 'GET':
         return render(request, 'register.html')
@@ -192,15 +532,15 @@ def register(request):
             errors.append("The password repeated is not the same as the original one")
 
         if not errors:
-            password_hashed = password.encode('utf-8')
-            # Generate salt
-            mySalt = bcrypt.gensalt()
-
             # Hash password
-            hash = bcrypt.hashpw(password_hashed, mySalt)
             try:
-                user = User(email=email, password=hash.decode('utf-8'))
-                user.save()
+                hash = await passwords.hash_password(password)
+            except PoolBusy:
+                errors.append("Too many registrations in progress, please try again")
+                return render(request, 'register.html', {'errors': errors}, status=503)
+            try:
+                user = User(email=email, password=hash)
+                await user.asave()
                 return render(request, 'register.html', {'success': "User registered!"})
             except:
                 errors.append("Something wrong, user already registered?")
@@ -212,4 +552,5 @@ def register(request):
 def logout(request):
     if "email" in request.session:
         del request.session["email"]
+        request.session.pop("user_id", None)
         return redirect('/login')
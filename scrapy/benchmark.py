@@ -0,0 +1,92 @@
+"""
+Replay the synthetic pages of fixtures/ through the spider callbacks,
+offline, and report the parse throughput, e.g.
+    python benchmark.py --repeat 500
+The pages are generated in the shape of the Transfermarkt tables the spider
+reads, not captured from the site: padded with made-up navigation and
+stylesheets, with invented players. Their throughput only compares two
+versions of the spider with each other, it does not predict the throughput
+on real pages.
+"""
+import argparse
+import os
+import time
+
+from scrapy.http import HtmlResponse, Request
+
+from transkermarktspider.spiders.transfermarkt import TransfermarktSpider
+
+# Synthetic page, url it stands for, callback parsing it and the meta it receives
+FIXTURES = [
+    ('synthetic_championship.html', 'https://www.transfermarkt.com/serie-a/startseite/wettbewerb/IT1/saison_id/2020',
+     'parse_squad_in_a_championship', {'year': 2020, 'championship': 'serie-a'}),
+    ('synthetic_team.html', 'https://www.transfermarkt.com/ac-milan/startseite/verein/5/saison_id/2020',
+     'parse_player_in_a_team', {'squad_name': 'AC Milan', 'year': 2020, 'championship': 'serie-a'}),
+    ('synthetic_player.html', 'https://www.transfermarkt.com/rafael-leao/leistungsdatendetails/spieler/1006/plus/0?saison=2020',
+     'parse_bio_player', {'player_name': 'Rafael Leao', 'age': 21, 'role': 'Left Winger', 'value_player': 35000000,
+                          'squad_name': 'AC Milan', 'year': 2020, 'championship': 'serie-a'}),
+    ('synthetic_goalkeeper.html', 'https://www.transfermarkt.com/mike-maignan/leistungsdatendetails/spieler/1016/plus/0?saison=2020',
+     'parse_bio_player', {'player_name': 'Mike Maignan', 'age': 25, 'role': 'Goalkeeper', 'value_player': 32000000,
+                          'squad_name': 'AC Milan', 'year': 2020, 'championship': 'serie-a'}),
+]
+
+
+def load(directory):
+    pages = []
+    for filename, url, callback, meta in FIXTURES:
+        with open(os.path.join(directory, filename), 'rb') as f:
+            pages.append((url, f.read(), callback, meta))
+    return pages
+
+
+def replay(spider, pages):
+    """
+    Parse every page once, returning the items and requests it yields
+    """
+    items, requests = [], []
+    for url, body, callback, meta in pages:
+        response = HtmlResponse(url, body=body, encoding='utf-8', request=Request(url, meta=dict(meta)))
+        for result in getattr(spider, callback)(response):
+            if isinstance(result, Request):
+                requests.append(result)
+            else:
+                items.append(result)
+    return items, requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    parser.add_argument('--repeat', type=int, default=200, help="Passes over the fixtures")
+    parser.add_argument('--show', action='store_true', help="Print what one pass yields and exit")
+    args = parser.parse_args()
+
+    spider = TransfermarktSpider()
+    pages = load(args.fixtures)
+
+    if args.show:
+        items, requests = replay(spider, pages)
+        for item in items:
+            print(item)
+        for request in requests:
+            print(request.url, request.meta)
+        return
+
+    # Warm up imports and lazily built selectors before timing
+    replay(spider, pages)
+
+    items = requests = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        found_items, found_requests = replay(spider, pages)
+        items += len(found_items)
+        requests += len(found_requests)
+    elapsed = time.perf_counter() - start
+
+    count = args.repeat * len(pages)
+    print(f"{count} pages in {elapsed:.2f}s: {count / elapsed:.0f} pages/s, "
+          f"{items / elapsed:.0f} items/s, {requests / elapsed:.0f} requests/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# Lets the tests under tests/ import transkermarktspider and benchmark, run
+# with `pytest` from this directory
@@ -0,0 +1,60 @@
+"""
+Stand-in for www.transfermarkt.com serving the synthetic pages of
+fixtures/, to run the spider or shard.py offline, e.g.
+    python fixture_server.py --port 8000 &
+    python shard.py --processes 4 -s TRANSFERMARKT_URL=http://localhost:8000 -s HTTPCACHE_ENABLED=False
+Every request is logged with its time, to check the crawl's politeness.
+"""
+import argparse
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Page served for the urls containing each pattern
+ROUTES = [
+    ('/startseite/wettbewerb/', 'synthetic_championship.html'),
+    ('/startseite/verein/', 'synthetic_team.html'),
+    ('/leistungsdatendetails/', 'synthetic_player.html'),
+]
+
+HOME = b'<!DOCTYPE html><html><head><title>Transfermarkt</title></head><body></body></html>'
+
+
+def handler(directory):
+    pages = {name: open(os.path.join(directory, name), 'rb').read() for _, name in ROUTES}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/':
+                body = HOME
+            else:
+                body = next((pages[name] for pattern, name in ROUTES if pattern in self.path), None)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"{time.time():.3f} {format % args}\n")
+
+    return FixtureHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('localhost', args.port), handler(args.fixtures))
+    print(f"Serving {args.fixtures} on http://localhost:{args.port}", file=sys.stderr)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,9 @@
+import sys
+
 from scrapy import cmdline
 
-cmdline.execute("scrapy crawl transfermarkt -o transfermarkt.json".split())
\ No newline at end of file
+# Items go straight to the backend database through DatabasePipeline. Extra
+# arguments are passed to scrapy, e.g. an incremental and resumable refresh:
+#   python main.py -a seasons=2021 -a leagues=serie-a -s JOBDIR=crawls/serie-a-2021
+# and -s PARQUET_EXPORT_DIR=export also writes them as Parquet for parseData --parquet.
+cmdline.execute("scrapy crawl transfermarkt".split() + sys.argv[1:])
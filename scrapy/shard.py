@@ -0,0 +1,101 @@
+"""
+Crawl the (league, season) shards in parallel worker processes, then merge
+their Parquet exports, e.g. a full historical backfill on 4 cores:
+    python shard.py --processes 4 --seasons 2010-2021 --load
+Every shard is a `scrapy crawl` of its own, with its own export partition,
+job directory and log under --output. Shards that finished are skipped when
+the backfill runs again; delete a shard's directory to crawl it again.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from transkermarktspider.spiders.transfermarkt import CHAMPIONSHIPS, FIRST_SEASON, LAST_SEASON, parse_seasons
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(os.path.dirname(HERE), 'backend')
+
+
+def run_shard(args, league, season):
+    name = f"{league}-{season}"
+    export = os.path.join(args.output, 'shards', name)
+    done = os.path.join(export, '_SUCCESS')
+    if os.path.exists(done):
+        return name, "already crawled"
+
+    log = os.path.join(args.output, 'logs', name + '.log')
+    os.makedirs(os.path.dirname(log), exist_ok=True)
+    command = [
+        sys.executable, '-m', 'scrapy', 'crawl', 'transfermarkt',
+        '-a', f'leagues={league}', '-a', f'seasons={season}',
+        '-s', f'PARQUET_EXPORT_DIR={export}',
+        '-s', f'JOBDIR={os.path.join(args.output, "jobs", name)}',
+        # The merged export is loaded once at the end, not by every shard
+        '-s', 'DATABASE_PIPELINE_ENABLED=False',
+        # Together the shards stay within the politeness of a single crawler
+        '-s', f'SHARED_THROTTLE_DIR={os.path.join(args.output, "throttle")}',
+        '-s', f'SHARED_THROTTLE_DELAY={args.delay}',
+        '-s', f'CONCURRENT_REQUESTS_PER_DOMAIN={max(1, args.concurrency // args.processes)}',
+        '-s', 'LOG_ENABLED=True', '-s', 'LOG_LEVEL=INFO', '-s', f'LOG_FILE={log}',
+    ]
+    for setting in args.set:
+        command += ['-s', setting]
+
+    result = subprocess.run(command, cwd=HERE)
+    if result.returncode:
+        return name, f"failed with exit code {result.returncode}, see {log}"
+    open(done, 'w').close()
+    return name, "crawled"
+
+
+def merge(output):
+    """
+    Copy the partitions of every finished shard into one export. Shards
+    never share a league/season partition, so nothing is overwritten.
+    """
+    merged = os.path.join(output, 'merged')
+    shards = os.path.join(output, 'shards')
+    for name in sorted(os.listdir(shards)):
+        if os.path.exists(os.path.join(shards, name, '_SUCCESS')):
+            shutil.copytree(os.path.join(shards, name), merged, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns('_SUCCESS'))
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help="Shards crawled at once")
+    parser.add_argument('--seasons', default=f"{FIRST_SEASON}-{LAST_SEASON}")
+    parser.add_argument('--leagues', default=",".join(CHAMPIONSHIPS))
+    parser.add_argument('--output', default='crawls/backfill')
+    parser.add_argument('--delay', type=float, default=0.5,
+                        help="Seconds between two requests to the site, across every shard")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="Requests in flight to the site, across every shard")
+    parser.add_argument('--load', action='store_true', help="Load the merged export with parseData --parquet")
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="Scrapy setting passed to every shard")
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)
+
+    shards = [(league, season) for league in args.leagues.split(",") for season in parse_seasons(args.seasons)]
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.processes) as pool:
+        for name, status in pool.map(lambda shard: run_shard(args, *shard), shards):
+            failed += status.startswith("failed")
+            print(f"{name}: {status}")
+
+    merged = merge(args.output)
+    print(f"Merged {len(shards) - failed} shards into {merged}")
+    if failed:
+        sys.exit(f"{failed} shards failed, run again to retry them")
+
+    if args.load:
+        subprocess.run([sys.executable, 'manage.py', 'parseData', '--parquet', merged], cwd=BACKEND, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from benchmark import FIXTURES
+from transkermarktspider.extract import player_rows, squad_rows, stats_totals
+
+# The synthetic pages follow the markup the XPaths expect, these tests catch a
+# change of the extractors, not a change of the real site
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+
+@pytest.fixture(scope='module')
+def pages():
+    """Response of every synthetic page, by file name"""
+    pages = {}
+    for filename, url, _, meta in FIXTURES:
+        with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+            pages[filename] = HtmlResponse(url, body=f.read(), encoding='utf-8', request=Request(url, meta=dict(meta)))
+    return pages
+
+
+def test_squad_rows_of_a_championship(pages):
+    rows = list(squad_rows(pages['synthetic_championship.html']))
+
+    assert len(rows) == 20
+    assert rows[0] == ('AC Milan', '/ac-milan/startseite/verein/5/saison_id/2020', ['34', '28.7', '14'], '€281.35m')
+    assert all(name and link for name, link, _, _ in rows)
+
+
+def test_player_rows_of_a_team(pages):
+    rows = list(player_rows(pages['synthetic_team.html']))
+
+    assert len(rows) == 30
+    assert rows[0] == ('Marco Rossi', '/marco-rossi/profil/spieler/1000', 'Goalkeeper', 'Jan 1, 1990 (30)', '€10.07m')
+    assert rows[1][4] == '€220Th.'
+
+
+def test_stats_totals_of_a_player(pages):
+    assert stats_totals(pages['synthetic_player.html']) == (['29', '8', '5', '4', '-'], ['Total 20/21:', "2.846'"])
+
+
+def test_stats_totals_of_a_goalkeeper(pages):
+    assert stats_totals(pages['synthetic_goalkeeper.html']) == (['34', '-', '-', '31', '17'], ['Total 20/21:', "2.846'"])
+
+
+def test_stats_totals_of_a_page_without_stats(pages):
+    assert stats_totals(pages['synthetic_team.html']) is None
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from fixture_server import handler
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('localhost', 0), handler(os.path.join(HERE, 'fixtures')))
+    # Keep the request log out of the test output
+    server.RequestHandlerClass.log_message = lambda *args: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_spider_crawls_a_season_from_the_fixture_server(server, tmp_path):
+    output = tmp_path / 'items.jsonl'
+    # A crawl of its own, the Twisted reactor cannot be restarted in the test process
+    subprocess.run([
+        sys.executable, '-m', 'scrapy', 'crawl', 'transfermarkt', '-a', 'leagues=serie-a', '-a', 'seasons=2020',
+        '-s', f'TRANSFERMARKT_URL={server}', '-s', 'HTTPCACHE_ENABLED=False', '-s', 'ITEM_PIPELINES={}',
+        '-O', str(output),
+    ], cwd=HERE, check=True, timeout=300)
+
+    items = [json.loads(line) for line in output.read_text().splitlines()]
+    squads = [item for item in items if 'squad_value' in item]
+    # Every club of the championship page links to the same team page of 30 players
+    assert len(squads) == 20
+    assert len(items) - len(squads) == 20 * 30
+    assert {item['year'] for item in items} == {2020}
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from scrapy import Spider
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from benchmark import FIXTURES
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures')
+
+
+@pytest.fixture
+def middleware(tmp_path):
+    crawler = get_crawler(Spider, {
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_DIR': str(tmp_path),
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_POLICY': 'transkermarktspider.httpcache.ClosedSeasonPolicy',
+        'TRANSFERMARKT_OPEN_SEASON': 2021,
+    })
+    spider = crawler.spider = Spider.from_crawler(crawler, 'transfermarkt')
+    middleware = HttpCacheMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    yield middleware
+    middleware.spider_closed(spider)
+
+
+def championship(year, status=200):
+    """Request of the synthetic championship page for `year`, and its response"""
+    filename, url, _, meta = FIXTURES[0]
+    url = url.replace('2020', str(year))
+    with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+        body = f.read()
+    request = Request(url, meta=dict(meta, year=year))
+    return request, HtmlResponse(url, status=status, body=body, encoding='utf-8', request=request)
+
+
+def fetch(middleware, request, response):
+    """
+    What the crawl gets for `request`: the cached page, or `response` as if
+    downloaded, passed through the middleware
+    """
+    cached = middleware.process_request(request)
+    if cached is not None:
+        return cached
+    return middleware.process_response(request, response)
+
+
+def test_closed_season_is_served_from_the_cache(middleware):
+    request, response = championship(2020)
+    fetch(middleware, request, response)
+
+    cached = middleware.process_request(request.copy())
+
+    assert cached is not None
+    assert 'cached' in cached.flags
+    assert cached.body == response.body
+
+
+def test_open_season_is_refetched(middleware):
+    request, response = championship(2021)
+    fetch(middleware, request, response)
+
+    assert middleware.process_request(request.copy()) is None
+
+
+def test_pages_without_a_season_are_refetched(middleware):
+    request, response = championship(2020)
+    request = request.replace(meta={})
+    fetch(middleware, request, response)
+
+    assert middleware.process_request(request.copy()) is None
+
+
+def test_failed_closed_season_page_is_refetched(middleware):
+    request, response = championship(2020, status=403)
+    fetch(middleware, request, response)
+
+    assert middleware.process_request(request.copy()) is None
@@ -0,0 +1,60 @@
+# Table extraction for the Transfermarkt pages
+#
+# The XPath expressions are compiled once and run on the lxml tree behind the
+# response, so a table is walked once and every column of a row is read
+# without building a Selector per cell.
+
+from lxml import etree
+
+SQUAD_ROWS = etree.XPath("//table[@class='items']//tbody//tr[@class='odd' or @class='even']")
+SQUAD_NAME = etree.XPath("(.//td[@class='hauptlink no-border-links']//a/text())[1]")
+SQUAD_LINK = etree.XPath("(.//td[@class='hauptlink no-border-links']//a/@href)[1]")
+SQUAD_COUNTS = etree.XPath(".//td[@class='zentriert']//text()")
+SQUAD_VALUE = etree.XPath("(.//td[@class='rechts']//a/text())[1]")
+
+PLAYER_ROWS = etree.XPath("//tbody//tr[@class='odd' or @class='even']")
+PLAYER_NAME = etree.XPath("(.//span[@class='hide-for-small']//a/@title)[1]")
+PLAYER_LINK = etree.XPath("(.//span[@class='hide-for-small']//a/@href)[1]")
+PLAYER_ROLE = etree.XPath("(.//td/text())[1]")
+PLAYER_BIRTHDAY = etree.XPath("(.//td[@class='zentriert']//text())[1]")
+PLAYER_VALUE = etree.XPath("(.//td[@class='rechts hauptlink']//a/text())[1]")
+
+STATS_FOOTER = etree.XPath("boolean(//table[@class='items']//tfoot)")
+STATS_TOTALS = etree.XPath("//table[@class='items']//tfoot//td[@class='zentriert']//text()")
+STATS_MINUTES = etree.XPath("//table[@class='items']//tfoot//td[@class='rechts']//text()")
+
+
+def first(path, node):
+    found = path(node)
+    return str(found[0]) if found else None
+
+
+def squad_rows(response):
+    """
+    (name, link, [number of players, average age, ...], market value) of
+    every club of a championship page
+    """
+    for row in SQUAD_ROWS(response.selector.root):
+        yield (first(SQUAD_NAME, row), first(SQUAD_LINK, row),
+               [str(text) for text in SQUAD_COUNTS(row)], first(SQUAD_VALUE, row))
+
+
+def player_rows(response):
+    """
+    (name, link, role, date of birth, market value) of every player of a
+    club page
+    """
+    for row in PLAYER_ROWS(response.selector.root):
+        yield (first(PLAYER_NAME, row), first(PLAYER_LINK, row), first(PLAYER_ROLE, row),
+               first(PLAYER_BIRTHDAY, row), first(PLAYER_VALUE, row))
+
+
+def stats_totals(response):
+    """
+    The centered and right aligned cells of the totals row of a player stats
+    page, None when the page has no stats table
+    """
+    root = response.selector.root
+    if not STATS_FOOTER(root):
+        return None
+    return [str(text) for text in STATS_TOTALS(root)], [str(text) for text in STATS_MINUTES(root)]
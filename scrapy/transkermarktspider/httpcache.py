@@ -0,0 +1,36 @@
+# HTTP cache policy for incremental crawls
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+
+import datetime
+
+from scrapy.extensions.httpcache import DummyPolicy
+
+
+def current_season(today=None):
+    """Transfermarkt seasons are named after the year they start, in July"""
+    today = today or datetime.date.today()
+    return today.year if today.month >= 7 else today.year - 1
+
+
+class ClosedSeasonPolicy(DummyPolicy):
+    """
+    Pages of a closed season no longer change: once fetched they are served
+    from the cache forever. Pages of the running season, and pages that do
+    not belong to a season, always go to the network and are not stored.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.open_season = settings.getint('TRANSFERMARKT_OPEN_SEASON') or current_season()
+
+    def closed(self, request):
+        year = request.meta.get('year')
+        return year is not None and int(year) < self.open_season
+
+    def should_cache_request(self, request):
+        return self.closed(request) and super().should_cache_request(request)
+
+    def should_cache_response(self, response, request):
+        return response.status == 200 and super().should_cache_response(response, request)
@@ -3,7 +3,15 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import fcntl
+import os
+import time
+from urllib.parse import urlparse
+
 from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet import reactor, task
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -101,3 +109,45 @@ class TranskermarktspiderDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class SharedThrottleMiddleware:
+    """
+    Spaces the requests sent to a domain by SHARED_THROTTLE_DELAY seconds
+    across every crawler process sharing SHARED_THROTTLE_DIR, so the shards
+    of a parallel crawl are together as polite as a single crawler. The next
+    free slot of every domain is kept in a file of that directory, under a
+    lock. Responses served by the HTTP cache do not take a slot.
+    """
+
+    def __init__(self, directory, delay):
+        self.directory = directory
+        self.delay = delay
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get('SHARED_THROTTLE_DIR') or not settings.getfloat('SHARED_THROTTLE_DELAY'):
+            raise NotConfigured
+        return cls(settings.get('SHARED_THROTTLE_DIR'), settings.getfloat('SHARED_THROTTLE_DELAY'))
+
+    def reserve(self, domain):
+        """
+        Take the next free slot of `domain`, returning how long to wait for it
+        """
+        with open(os.path.join(self.directory, domain), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            now = time.time()
+            slot = max(now, float(f.read() or 0))
+            f.seek(0)
+            f.truncate()
+            f.write(repr(slot + self.delay))
+        return slot - now
+
+    async def process_request(self, request, spider):
+        wait = self.reserve(urlparse(request.url).netloc)
+        if wait > 0:
+            await maybe_deferred_to_future(task.deferLater(reactor, wait, lambda: None))
+        return None
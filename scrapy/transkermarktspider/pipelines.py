@@ -3,11 +3,223 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+from twisted.internet import reactor, threads
+from twisted.python.threadpool import ThreadPool
 
 
 class TranskermarktspiderPipeline:
     def process_item(self, item, spider):
         return item
+
+
+def player_row(item):
+    """
+    A player item as a players.csv row
+    """
+    return {
+        'namePlayer': item['name_player'],
+        'age': item['age'],
+        'role': item['role'],
+        'valuePlayer': item['value_player'],
+        'nameTeam': item['squad_name'],
+        'year': item['year'],
+        'games': item['games_played'],
+        'goals': item.get('goals'),
+        'assists': item.get('assists'),
+        'minutes': item['minute_played'],
+        'nameLeague': item['championship'],
+        'goalsConceded': item.get('goals_conceded'),
+        'cleanSheets': item.get('clean_sheets'),
+    }
+
+
+def team_row(item):
+    """
+    A squad item as a squads.csv row
+    """
+    return {
+        'nameTeam': item['squad_name'],
+        'avgAge': item['avg_age'],
+        'valueTeam': item['squad_value'],
+        'year': item['year'],
+        'numberPlayers': item['number_players'],
+        'nameLeague': item['championship'],
+    }
+
+
+# Parquet columns of both item kinds, nameLeague and year are the partitions
+PARQUET_SCHEMAS = {
+    'players': pa.schema([
+        ('namePlayer', pa.string()),
+        ('age', pa.int32()),
+        ('role', pa.string()),
+        ('valuePlayer', pa.int64()),
+        ('nameTeam', pa.string()),
+        ('games', pa.int32()),
+        ('goals', pa.int32()),
+        ('assists', pa.int32()),
+        ('minutes', pa.int32()),
+        ('goalsConceded', pa.int32()),
+        ('cleanSheets', pa.int32()),
+    ]),
+    'squads': pa.schema([
+        ('nameTeam', pa.string()),
+        ('avgAge', pa.float64()),
+        ('valueTeam', pa.int64()),
+        ('numberPlayers', pa.int32()),
+    ]),
+}
+
+
+class ParquetPipeline:
+    """
+    Writes the items as typed Parquet files partitioned by league and season,
+    e.g. <PARQUET_EXPORT_DIR>/players/nameLeague=serie-a/year=2020/part-0.parquet,
+    which parseData --parquet loads. Rows are written as a row group every
+    PARQUET_EXPORT_BATCH_SIZE rows of a partition, and a file only appears
+    once the spider closes, so a crashed crawl leaves no truncated file.
+    """
+
+    def __init__(self, directory, batch_size):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.writers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.get('PARQUET_EXPORT_DIR'):
+            raise NotConfigured
+        return cls(
+            directory=settings.get('PARQUET_EXPORT_DIR'),
+            batch_size=settings.getint('PARQUET_EXPORT_BATCH_SIZE', 1000),
+        )
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        if 'name_player' in adapter:
+            kind, row = 'players', player_row(adapter)
+        elif 'number_players' in adapter:
+            kind, row = 'squads', team_row(adapter)
+        else:
+            return item
+
+        partition = (kind, row['nameLeague'], row['year'])
+        rows = self.buffers.setdefault(partition, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.write(partition)
+        return item
+
+    def path(self, partition):
+        kind, league, year = partition
+        return os.path.join(self.directory, kind, f"nameLeague={league}", f"year={year}", "part-0.parquet")
+
+    def write(self, partition):
+        rows = self.buffers.pop(partition, [])
+        if not rows:
+            return
+        schema = PARQUET_SCHEMAS[partition[0]]
+        writer = self.writers.get(partition)
+        if writer is None:
+            path = self.path(partition)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writer = self.writers[partition] = pq.ParquetWriter(path + ".tmp", schema)
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    def close_spider(self, spider):
+        for partition in list(self.buffers):
+            self.write(partition)
+        for partition, writer in self.writers.items():
+            writer.close()
+            os.replace(self.path(partition) + ".tmp", self.path(partition))
+        spider.logger.info(f"ParquetPipeline: {len(self.writers)} partitions written to {self.directory}")
+
+
+class DatabasePipeline:
+    """
+    Upserts the scraped items into Player_Status/Team_Status through the
+    backend's Django models, DATABASE_PIPELINE_BATCH_SIZE items at a time and
+    once more when the spider closes. Writes run on a single thread of their
+    own, so the database is never used from the reactor.
+    """
+
+    def __init__(self, project_dir, settings_module, batch_size):
+        self.project_dir = project_dir
+        self.settings_module = settings_module
+        self.batch_size = batch_size
+        self.players = []
+        self.teams = []
+        self.written = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('DATABASE_PIPELINE_ENABLED', True):
+            raise NotConfigured
+        return cls(
+            project_dir=settings.get('DJANGO_PROJECT_DIR'),
+            settings_module=settings.get('DJANGO_SETTINGS_MODULE'),
+            batch_size=settings.getint('DATABASE_PIPELINE_BATCH_SIZE', 1000),
+        )
+
+    def open_spider(self, spider):
+        sys.path.insert(0, os.path.abspath(self.project_dir))
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', self.settings_module)
+
+        import django
+        django.setup()
+        from djangoProject3.ingest import Ingest
+
+        self.ingest = Ingest(batch_size=self.batch_size, progress=spider.logger.info)
+        self.pool = ThreadPool(minthreads=1, maxthreads=1, name='DatabasePipeline')
+        self.pool.start()
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        if 'name_player' in adapter:
+            self.players.append(player_row(adapter))
+            if len(self.players) >= self.batch_size:
+                return self.flush().addCallback(lambda _: item)
+        elif 'number_players' in adapter:
+            self.teams.append(team_row(adapter))
+            if len(self.teams) >= self.batch_size:
+                return self.flush().addCallback(lambda _: item)
+        return item
+
+    def flush(self, last=False):
+        players, self.players = self.players, []
+        teams, self.teams = self.teams, []
+        return threads.deferToThreadPool(reactor, self.pool, self.write, players, teams, last)
+
+    def write(self, players, teams, last):
+        from django.db import connection
+        from djangoProject3.forecast_cache import bump_dataset_version
+
+        try:
+            if teams:
+                self.written += self.ingest.teams(teams)
+            if players:
+                self.written += self.ingest.players(players)
+            if last and self.written:
+                bump_dataset_version()
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+    def close_spider(self, spider):
+        def stop(result):
+            self.pool.stop()
+            spider.logger.info(f"DatabasePipeline: {self.written} rows upserted")
+            return result
+
+        return self.flush(last=True).addBoth(stop)
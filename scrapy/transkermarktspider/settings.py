@@ -7,6 +7,8 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
 BOT_NAME = 'transkermarktspider'
 
 SPIDER_MODULES = ['transkermarktspider.spiders']
@@ -54,9 +56,15 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    'transkermarktspider.middlewares.TranskermarktspiderDownloaderMiddleware': 543,
-#}
+# SharedThrottleMiddleware comes after the HTTP cache (900), cached pages are not throttled
+DOWNLOADER_MIDDLEWARES = {
+    'transkermarktspider.middlewares.SharedThrottleMiddleware': 950,
+}
+
+# Delay between two requests to a domain, shared by every process using the
+# same directory (disabled when unset), see shard.py
+#SHARED_THROTTLE_DIR = 'crawls/throttle'
+#SHARED_THROTTLE_DELAY = 0.5
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -66,9 +74,20 @@ ROBOTSTXT_OBEY = True
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    'transkermarktspider.pipelines.TranskermarktspiderPipeline': 300,
-#}
+ITEM_PIPELINES = {
+    'transkermarktspider.pipelines.DatabasePipeline': 300,
+    'transkermarktspider.pipelines.ParquetPipeline': 400,
+}
+
+# Where DatabasePipeline finds the backend, and how many items it upserts at a time
+DATABASE_PIPELINE_ENABLED = True
+DJANGO_PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'backend')
+DJANGO_SETTINGS_MODULE = 'djangoProject3.settings'
+DATABASE_PIPELINE_BATCH_SIZE = 1000
+
+# Also export the items as Parquet partitioned by league/season (disabled when unset)
+#PARQUET_EXPORT_DIR = 'export'
+PARQUET_EXPORT_BATCH_SIZE = 1000
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -85,8 +104,16 @@ ROBOTSTXT_OBEY = True
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
-#HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = 'httpcache'
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+# Closed seasons are only downloaded once, see transkermarktspider.httpcache
+HTTPCACHE_ENABLED = True
+HTTPCACHE_EXPIRATION_SECS = 0
+HTTPCACHE_DIR = 'httpcache'
+HTTPCACHE_IGNORE_HTTP_CODES = [403, 404, 429, 500, 502, 503, 504]
+HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+HTTPCACHE_POLICY = 'transkermarktspider.httpcache.ClosedSeasonPolicy'
+HTTPCACHE_GZIP = True
+# First season that is still being played, defaults to the one running today
+#TRANSFERMARKT_OPEN_SEASON = 2021
+
+# Site crawled, e.g. http://localhost:8000 for fixture_server.py
+#TRANSFERMARKT_URL = 'https://www.transfermarkt.com'
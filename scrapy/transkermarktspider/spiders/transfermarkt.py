@@ -1,6 +1,9 @@
 import scrapy
 import unidecode
 import re
+from urllib.parse import urlparse
+
+from transkermarktspider.extract import player_rows, squad_rows, stats_totals
 
 cleanString = lambda x: '' if x is None else unidecode.unidecode(re.sub(r'\s+', ' ', x))
 
@@ -21,42 +24,77 @@ def change_money(money):
     return 0
 
 
+# Transfermarkt competition id of every championship crawled
+CHAMPIONSHIPS = {
+    "serie-a": "IT1",
+    "premier-league": "GB1",
+    "primera-division": "ES1",
+    "ligue-1": "FR1",
+    "bundesliga": "L1",
+}
+
+FIRST_SEASON = 2010
+LAST_SEASON = 2021
+
+
+def parse_seasons(value):
+    """
+    Seasons from a spider argument: "2021", "2018-2021" or "2015,2018-2021"
+    """
+    seasons = []
+    for part in str(value).split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            seasons.extend(range(int(first), int(last) + 1))
+        elif part.strip():
+            seasons.append(int(part))
+    return sorted(set(seasons))
+
+
 class TransfermarktSpider(scrapy.Spider):
     name = 'transfermarkt'
     allowed_domains = ['www.transfermarkt.com']
     start_urls = ['https://www.transfermarkt.com/']
+    base_url = 'https://www.transfermarkt.com'
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        # TRANSFERMARKT_URL points the crawl somewhere else, e.g. a local fixture server
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        base_url = crawler.settings.get('TRANSFERMARKT_URL')
+        if base_url:
+            spider.base_url = base_url.rstrip("/")
+            spider.allowed_domains = [urlparse(base_url).hostname]
+            spider.start_urls = [spider.base_url + "/"]
+        return spider
+
+    def __init__(self, seasons=None, leagues=None, *args, **kwargs):
+        """
+        Crawl only some seasons and championships, e.g.
+        scrapy crawl transfermarkt -a seasons=2021 -a leagues=serie-a,ligue-1
+        """
+        super().__init__(*args, **kwargs)
+        self.seasons = parse_seasons(seasons) if seasons else list(range(FIRST_SEASON, LAST_SEASON + 1))
+        self.championships = leagues.split(",") if leagues else list(CHAMPIONSHIPS)
+        unknown = set(self.championships) - set(CHAMPIONSHIPS)
+        if unknown:
+            raise ValueError(f"Unknown championships: {', '.join(sorted(unknown))}")
 
     def parse(self, response):
-        championships = ["serie-a", "premier-league", "primera-division", "ligue-1", "bundesliga"]
-        for championship in championships:
-            for i in range(2010, 2022):
-                link = ""
-                if championship == "serie-a":
-                    link = "https://www.transfermarkt.com/" + championship + "/startseite/wettbewerb/IT1/saison_id/" + str(i)
-                elif championship == "premier-league":
-                    link = "https://www.transfermarkt.com/" + championship + "/startseite/wettbewerb/GB1/saison_id/" + str(i)
-                elif championship == "primera-division":
-                    link = "https://www.transfermarkt.com/" + championship + "/startseite/wettbewerb/ES1/saison_id/" + str(i)
-                elif championship == "ligue-1":
-                    link = "https://www.transfermarkt.com/" + championship + "/startseite/wettbewerb/FR1/saison_id/" + str(i)
-                elif championship == "bundesliga":
-                    link = "https://www.transfermarkt.com/" + championship + "/startseite/wettbewerb/L1/saison_id/" + str(i)
-                if link != "":
-                    yield response.follow(link, callback=self.parse_squad_in_a_championship, dont_filter = True, meta={'year': i, 'championship': championship})
-                pass
+        for championship in self.championships:
+            for i in self.seasons:
+                link = self.base_url + "/" + championship + "/startseite/wettbewerb/" + \
+                       CHAMPIONSHIPS[championship] + "/saison_id/" + str(i)
+                yield response.follow(link, callback=self.parse_squad_in_a_championship, meta={'year': i, 'championship': championship})
 
     def parse_squad_in_a_championship(self, response):
-        a_table = response.css("table[class='items'] tbody")
-        squads = a_table.css("tr[class='odd']") + a_table.css("tr[class='even']")
-        for squad in squads:
-            name_squad = cleanString(squad.css("td[class='hauptlink no-border-links'] a::text").extract_first())
+        for name, link_squad, avg_age_set, value in squad_rows(response):
+            name_squad = cleanString(name)
             if(name_squad!=""):
-                avg_age_set = squad.css("td[class='zentriert'] ::text").extract()
                 number_players = avg_age_set[0]
                 avg_age = avg_age_set[1]
-                squad_value = cleanString(squad.css("td[class='rechts'] a::text").extract_first())
+                squad_value = cleanString(value)
                 money = change_money(squad_value)
-                link_squad = squad.css("td[class='hauptlink no-border-links'] a::attr(href)").extract_first()
                 if name_squad:
                     yield {
                         'squad_name': name_squad,
@@ -66,33 +104,30 @@ class TransfermarktSpider(scrapy.Spider):
                         'number_players': int(number_players),
                         'championship': response.meta['championship']
                     }
-                    link = "https://www.transfermarkt.com" + link_squad
+                    link = self.base_url + link_squad
                     yield response.follow(link,
-                                          callback=self.parse_player_in_a_team, dont_filter = True,
+                                          callback=self.parse_player_in_a_team,
                                           meta={'squad_name': name_squad, 'year': response.meta['year'], 'championship': response.meta['championship']})
                 pass
 
     def parse_player_in_a_team(self, response):
-        a_table = response.css("tbody")
-        players = a_table.css("tr[class='odd']") + a_table.css("tr[class='even']")
-        for player in players:
-            name_player = cleanString(player.css("span[class='hide-for-small'] a::attr(title)").extract_first())
-            role_extract = player.css("tr td::text").extract()
-            role = role_extract[0]
+        for name, link_player, role, born, value in player_rows(response):
+            name_player = cleanString(name)
             try:
-                birthday = int(player.css("td[class ='zentriert'] ::text").extract_first().split("(")[1].split(")")[0])
+                birthday = int(born.split("(")[1].split(")")[0])
             except:
                 birthday = -1
-            value_player = cleanString(player.css("td[class='rechts hauptlink'] a::text").extract_first())
+            value_player = cleanString(value)
             money = change_money(value_player)
             if(money==0):
                 money=-1
-            link_player = player.css("span[class='hide-for-small'] a::attr(href)").extract_first()
             name_link = link_player.split("/")[1]
             id_link = link_player.split("/")[4]
-            create_link = "https://www.transfermarkt.com/" + name_link + "/leistungsdatendetails/spieler/" + id_link + "/plus/0?saison=" + \
+            create_link = self.base_url + "/" + name_link + "/leistungsdatendetails/spieler/" + id_link + "/plus/0?saison=" + \
                           str(response.meta['year']) + "&verein=&liga=&wettbewerb=&pos=&trainer_id="
             if name_player:
+                # The stats page does not depend on the squad, keep a player
+                # who changed squads within a championship in both of them.
                 yield response.follow(create_link,
                                       callback=self.parse_bio_player, dont_filter = True,
                                       meta={'player_name': name_player, 'age': birthday, 'role': role,
@@ -101,15 +136,14 @@ class TransfermarktSpider(scrapy.Spider):
             pass
 
     def parse_bio_player(self, response):
-        a_table = response.css("table[class='items'] tfoot")
-        if a_table:
+        totals = stats_totals(response)
+        if totals:
             games_played = 0
             minute_played = 0
             goals = 0
             assists = 0
             minute = 0
-            stats = a_table.css("td[class='zentriert'] ::text").extract()
-            minute_played_t = a_table.css("td[class='rechts'] ::text").extract()
+            stats, minute_played_t = totals
 
             try:
                 minute = int(re.sub("[^0-9]", "", minute_played_t[1]))